@@ -7,8 +7,8 @@ Designed for processing archived observations and reprocessing campaigns.
 Author: STScI Demo Project
 """
 
-from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from datetime import date, datetime, timedelta
+from typing import List, Dict, Any, Optional, Tuple
 
 from airflow import DAG
 from airflow.operators.python import PythonOperator
@@ -21,11 +21,21 @@ from airflow.utils.task_group import TaskGroup
 from airflow.models import Variable, XCom
 from airflow.exceptions import AirflowException
 from airflow.operators.email import EmailOperator
+from airflow.plugins.pipeline_common import get_s3_client, json_dumps, json_loads
 
-import boto3
+from boto3.s3.transfer import TransferConfig
+import csv
+import gzip
+import heapq
+import io
 import json
 import logging
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import requests
+from urllib.parse import unquote_plus
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice, takewhile
 
 # Default arguments
 default_args = {
@@ -50,12 +60,327 @@ dag = DAG(
     tags=['astronomy', 'batch-processing', 'historical-data'],
 )
 
-# Configuration
+# Configuration (each Variable is read once per DAG parse; task callables
+# use these constants rather than calling Variable.get per request)
 BATCH_SIZE = int(Variable.get("batch_processing_size", "100"))
 MAX_PARALLEL_JOBS = int(Variable.get("max_parallel_jobs", "10"))
+# Per-file submission is I/O-bound HTTP, so it runs on threads rather than
+# processes; the worker count is tunable per cluster
+FILE_SUBMIT_WORKERS = int(Variable.get("max_parallel_http_workers", "64"))
 S3_BUCKET_RAW = Variable.get("s3_bucket_raw", "astro-data-pipeline-raw-data-dev")
 S3_BUCKET_PROCESSED = Variable.get("s3_bucket_processed", "astro-data-pipeline-processed-data-dev")
-PROCESSING_NAMESPACE = Variable.get("k8s_namespace", "astro-pipeline")
+LIST_PAGE_SIZE = 1000  # S3 ListObjectsV2 maximum keys per page
+# StartAfter shard boundaries for flat prefixes
+LIST_SHARD_ALPHABET = '0123456789abcdef'
+LISTING_WORKERS = int(Variable.get("s3_listing_workers", "16"))
+# Daily S3 Inventory of the raw bucket (terraform/01-data/s3.tf), delivered
+# to the processed bucket
+INVENTORY_PREFIX = f"inventory/{S3_BUCKET_RAW}/raw-data-daily/"
+IMAGE_PROCESSOR_URL = Variable.get(
+    "image_processor_url", "http://image-processor-service:8080"
+)
+JSON_HEADERS = {'Content-Type': 'application/json'}
+STATUS_BATCH_SIZE = 500  # Job IDs per bulk status request
+MIN_POLL_INTERVAL = 5.0    # Seconds between status checks after a change
+MAX_POLL_INTERVAL = 300.0  # Upper bound for the backoff while jobs are idle
+
+# Pooled HTTP session shared by every task callable in this DAG
+HTTP_SESSION = requests.Session()
+_http_adapter = HTTPAdapter(
+    pool_connections=32,
+    pool_maxsize=FILE_SUBMIT_WORKERS,
+    max_retries=Retry(total=3, backoff_factor=0.2, status_forcelist=[502, 503, 504])
+)
+HTTP_SESSION.mount('http://', _http_adapter)
+HTTP_SESSION.mount('https://', _http_adapter)
+
+REPORT_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024, max_concurrency=8
+)
+
+def _date_partition_prefixes(s3_prefix: str, start_day: Optional[date],
+                             end_day: Optional[date]) -> List[str]:
+    """
+    Expand a date range into per-day S3 prefixes (<prefix>YYYY/MM/DD/).
+    """
+    if not start_day or not end_day:
+        return [s3_prefix]
+    
+    day = start_day
+    prefixes = []
+    while day <= end_day:
+        prefixes.append(f"{s3_prefix}{day.strftime('%Y/%m/%d')}/")
+        day += timedelta(days=1)
+    
+    return prefixes
+
+def _latest_inventory(s3_client) -> Optional[Tuple[Dict, datetime]]:
+    """
+    Locate the most recent S3 Inventory manifest for the raw bucket.
+    
+    Returns the parsed manifest.json and its delivery timestamp, or None if
+    no inventory has been delivered yet.
+    """
+    paginator = s3_client.get_paginator('list_objects_v2')
+    deliveries = []
+    
+    pages = paginator.paginate(
+        Bucket=S3_BUCKET_PROCESSED, Prefix=INVENTORY_PREFIX, Delimiter='/'
+    )
+    for page in pages:
+        for cp in page.get('CommonPrefixes', []):
+            # Delivery folders are named like 2024-01-15T01-00Z; skip data/ and hive/
+            name = cp['Prefix'][len(INVENTORY_PREFIX):].rstrip('/')
+            try:
+                delivered_at = datetime.strptime(name, '%Y-%m-%dT%H-%MZ')
+                deliveries.append((delivered_at, cp['Prefix']))
+            except ValueError:
+                continue
+    
+    if not deliveries:
+        return None
+    
+    delivered_at, delivery_prefix = max(deliveries)
+    response = s3_client.get_object(
+        Bucket=S3_BUCKET_PROCESSED, Key=f"{delivery_prefix}manifest.json"
+    )
+    return json.loads(response['Body'].read()), delivered_at
+
+def _inventory_files(s3_client, manifest: Dict, s3_prefix: str,
+                     start_day: Optional[date], end_day: Optional[date],
+                     start_after: Optional[str], limit: int) -> List[Dict]:
+    """
+    Read up to `limit` FITS file records for a prefix and date range from an
+    inventory manifest, in key order.
+    """
+    columns = [c.strip() for c in manifest['fileSchema'].split(',')]
+    key_idx = columns.index('Key')
+    size_idx = columns.index('Size')
+    modified_idx = columns.index('LastModifiedDate')
+    
+    def records():
+        for data_file in manifest['files']:
+            response = s3_client.get_object(
+                Bucket=S3_BUCKET_PROCESSED, Key=data_file['key']
+            )
+            body = gzip.GzipFile(fileobj=response['Body'])
+            rows = csv.reader(io.TextIOWrapper(body, encoding='utf-8'))
+            
+            for row in rows:
+                key = unquote_plus(row[key_idx])
+                if not key.startswith(s3_prefix) or not key.endswith('.fits'):
+                    continue
+                if start_after and key <= start_after:
+                    continue
+                
+                modified_at = row[modified_idx].replace('Z', '+00:00')
+                last_modified = datetime.fromisoformat(modified_at)
+                modified = last_modified.date()
+                if start_day and modified < start_day:
+                    continue
+                if end_day and modified > end_day:
+                    continue
+                
+                yield {
+                    'bucket': S3_BUCKET_RAW,
+                    'key': key,
+                    'size': int(row[size_idx]),
+                    'last_modified': last_modified.isoformat()
+                }
+    
+    # Inventory rows are unordered; keep only the smallest keys while streaming
+    # so max_files truncation matches a LIST without holding the whole prefix
+    return heapq.nsmallest(limit, records(), key=lambda f: f['key'])
+
+def _shard_ranges(s3_prefix: str) -> List[Tuple[str, Optional[str], Optional[str]]]:
+    """
+    Partition a flat prefix into contiguous key ranges for parallel listing.
+    
+    Each range is (prefix, start_after, stop_before). Boundaries fall on the
+    characters of LIST_SHARD_ALPHABET; the first and last ranges are open
+    so keys outside the alphabet are still covered. Using the boundary
+    itself as StartAfter is safe because no FITS key can equal it.
+    """
+    bounds = [None] + [f"{s3_prefix}{c}" for c in LIST_SHARD_ALPHABET[1:]] + [None]
+    return [(s3_prefix, lower, upper) for lower, upper in zip(bounds, bounds[1:])]
+
+def _split_prefix(
+    s3_client, s3_prefix: str, start_day: Optional[date], end_day: Optional[date],
+    start_after: Optional[str]
+) -> Tuple[List[Tuple[str, Optional[str], Optional[str]]], List[Dict]]:
+    """
+    Split a prefix into independently listable key ranges.
+    
+    Hierarchical prefixes are split on their immediate sub-prefixes using a
+    delimited listing, and FITS files stored directly under the prefix are
+    returned alongside. A flat prefix (no sub-prefixes on a full first page)
+    is split into StartAfter shards instead when its keys are hex-named, and
+    listed as a single range otherwise.
+    """
+    sub_prefixes = []
+    top_level_files = []
+    list_args = {
+        'Bucket': S3_BUCKET_RAW,
+        'Prefix': s3_prefix,
+        'Delimiter': '/',
+        'MaxKeys': LIST_PAGE_SIZE
+    }
+    
+    while True:
+        page = s3_client.list_objects_v2(**list_args)
+        
+        # Only shard when the flat keys are actually hex-named; any other
+        # naming would leave one shard holding the whole prefix
+        if 'ContinuationToken' not in list_args and page.get('IsTruncated') \
+                and not page.get('CommonPrefixes'):
+            first_keys = [
+                obj['Key'][len(s3_prefix):] for obj in page.get('Contents', [])
+            ]
+            if first_keys and all(
+                key[:1] and key[0] in LIST_SHARD_ALPHABET for key in first_keys
+            ):
+                return _shard_ranges(s3_prefix), []
+            return [(s3_prefix, None, None)], []
+        
+        sub_prefixes.extend(
+            (cp['Prefix'], None, None) for cp in page.get('CommonPrefixes', [])
+        )
+        top_level_files.extend(
+            _file_record(obj) for obj in page.get('Contents', [])
+            if obj['Key'].endswith('.fits')
+            and _in_date_range(obj, start_day, end_day)
+            and not (start_after and obj['Key'] <= start_after)
+        )
+        
+        if not page.get('IsTruncated'):
+            return sub_prefixes, top_level_files
+        list_args['ContinuationToken'] = page['NextContinuationToken']
+
+def _list_prefix_files(s3_client, prefix: str, start_day: Optional[date],
+                       end_day: Optional[date], limit: int, start_after: Optional[str],
+                       stop_before: Optional[str] = None) -> List[Dict]:
+    """
+    List up to `limit` FITS files under a single prefix in key order.
+    
+    Pagination is lazy, so no further LIST pages are requested once the
+    limit or the stop_before key is reached.
+    """
+    paginator = s3_client.get_paginator('list_objects_v2')
+    list_args = {'StartAfter': start_after} if start_after else {}
+    page_iterator = paginator.paginate(
+        Bucket=S3_BUCKET_RAW,
+        Prefix=prefix,
+        PaginationConfig={'PageSize': LIST_PAGE_SIZE},
+        **list_args
+    )
+    
+    # Suffix filtering is evaluated by botocore's JMESPath search
+    objects = page_iterator.search("Contents[?ends_with(Key, '.fits')]")
+    if stop_before:
+        objects = takewhile(lambda obj: obj['Key'] < stop_before, objects)
+    
+    matching = (
+        _file_record(obj)
+        for obj in objects
+        if _in_date_range(obj, start_day, end_day)
+    )
+    return list(islice(matching, limit))
+
+def _in_date_range(obj: Dict, start_day: Optional[date],
+                   end_day: Optional[date]) -> bool:
+    """Check an S3 object's LastModified date against the requested range."""
+    modified = obj['LastModified'].date()
+    if start_day and modified < start_day:
+        return False
+    if end_day and modified > end_day:
+        return False
+    return True
+
+def _file_record(obj: Dict) -> Dict[str, Any]:
+    """Convert an S3 listing entry into a batch file record."""
+    return {
+        'bucket': S3_BUCKET_RAW,
+        'key': obj['Key'],
+        'size': obj['Size'],
+        'last_modified': obj['LastModified'].isoformat()
+    }
+
+def _manifest_key(context, name: str) -> str:
+    """S3 key for a per-run manifest in the processed data bucket."""
+    return f"manifests/batch_processing/{context['dag_run'].run_id}/{name}.json.gz"
+
+def _write_manifest(s3_client, key: str, payload: Any) -> None:
+    """
+    Store a gzipped JSON manifest in S3.
+    
+    File lists are exchanged between tasks through S3 so that XCom only
+    carries the manifest key and summary counts.
+    """
+    s3_client.put_object(
+        Bucket=S3_BUCKET_PROCESSED,
+        Key=key,
+        Body=gzip.compress(json_dumps(payload)),
+        ContentType='application/json',
+        ContentEncoding='gzip'
+    )
+
+def _read_manifest(s3_client, key: str) -> Any:
+    """Load a gzipped JSON manifest written by _write_manifest."""
+    response = s3_client.get_object(Bucket=S3_BUCKET_PROCESSED, Key=key)
+    return json_loads(gzip.decompress(response['Body'].read()))
+
+def _list_batch_files(s3_client, conf: Dict, s3_prefix: str, start_day: Optional[date],
+                      end_day: Optional[date], max_files: int,
+                      start_after: Optional[str]) -> List[Dict]:
+    """
+    Discover FITS files with concurrent live S3 listings.
+    
+    Returns up to max_files + 1 files in key order; the extra file only
+    signals that the listing was truncated.
+    """
+    # Date-partitioned layouts (fits/YYYY/MM/DD/) are listed one day at a
+    # time so S3 only returns keys inside the requested range; otherwise
+    # the keyspace is split on the next '/' level
+    if conf.get('date_partitioned', False):
+        list_ranges = [
+            (prefix, None, None)
+            for prefix in _date_partition_prefixes(s3_prefix, start_day, end_day)
+        ]
+        top_level_files = []
+    else:
+        list_ranges, top_level_files = _split_prefix(
+            s3_client, s3_prefix, start_day, end_day, start_after
+        )
+    
+    # Ranges that sort entirely before the resume key hold nothing to list
+    if start_after:
+        list_ranges = [
+            (prefix, max(lower or '', start_after), upper)
+            for prefix, lower, upper in list_ranges
+            if (upper is None or upper > start_after)
+            and (prefix > start_after or start_after.startswith(prefix))
+        ]
+    
+    # Each range gets its own paginator; boto3 clients are thread-safe
+    prefix_files = []
+    workers = max(1, min(LISTING_WORKERS, len(list_ranges)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(_list_prefix_files, s3_client, prefix, start_day, end_day,
+                            max_files + 1, lower, upper)
+            for prefix, lower, upper in list_ranges
+        ]
+        
+        # Consume in range (= key) order; once more than max_files keys are
+        # known, later ranges cannot contribute and are cancelled
+        for future in futures:
+            if len(prefix_files) > max_files:
+                future.cancel()
+                continue
+            prefix_files.extend(future.result())
+    
+    files = sorted(top_level_files + prefix_files, key=lambda f: f['key'])
+    return files[:max_files + 1]
 
 def discover_batch_files(**context) -> Dict[str, Any]:
     """
@@ -72,53 +397,47 @@ def discover_batch_files(**context) -> Dict[str, Any]:
     file_pattern = conf.get('file_pattern', '*.fits')
     s3_prefix = conf.get('s3_prefix', 'fits/')
     max_files = conf.get('max_files', 1000)
+    start_after = conf.get('start_after')
     
     logging.info(f"Batch processing configuration: start_date={start_date}, "
                 f"end_date={end_date}, pattern={file_pattern}, max_files={max_files}")
     
-    s3_client = boto3.client('s3')
+    # Parse the range bounds once rather than for every listed object
+    start_day = datetime.fromisoformat(start_date).date() if start_date else None
+    end_day = datetime.fromisoformat(end_date).date() if end_date else None
+    
+    s3_client = get_s3_client()
     
     try:
-        # List objects in S3 with filtering
-        paginator = s3_client.get_paginator('list_objects_v2')
-        page_iterator = paginator.paginate(
-            Bucket=S3_BUCKET_RAW,
-            Prefix=s3_prefix
-        )
+        # Historical ranges (with an end_date) are served from the daily S3
+        # Inventory when it already covers end_date; otherwise list live
+        use_inventory = end_day and conf.get('use_inventory', True)
+        inventory = _latest_inventory(s3_client) if use_inventory else None
+        if inventory and inventory[1].date() <= end_day:
+            logging.info(f"Latest inventory ({inventory[1].isoformat()}) does not "
+                         f"cover end_date, using live listing")
+            inventory = None
         
-        batch_files = []
-        total_size = 0
+        if inventory:
+            logging.info(f"Discovering files from S3 Inventory delivered "
+                         f"{inventory[1].isoformat()}")
+            batch_files = _inventory_files(s3_client, inventory[0], s3_prefix,
+                                           start_day, end_day, start_after,
+                                           max_files + 1)
+        else:
+            batch_files = _list_batch_files(s3_client, conf, s3_prefix, start_day,
+                                            end_day, max_files, start_after)
         
-        for page in page_iterator:
-            if 'Contents' not in page:
-                continue
-                
-            for obj in page['Contents']:
-                # Apply date filtering if specified
-                if start_date and obj['LastModified'].date() < datetime.fromisoformat(start_date).date():
-                    continue
-                if end_date and obj['LastModified'].date() > datetime.fromisoformat(end_date).date():
-                    continue
-                
-                # Apply file pattern filtering
-                if not obj['Key'].endswith('.fits'):
-                    continue
-                
-                batch_files.append({
-                    'bucket': S3_BUCKET_RAW,
-                    'key': obj['Key'],
-                    'size': obj['Size'],
-                    'last_modified': obj['LastModified'].isoformat()
-                })
-                
-                total_size += obj['Size']
-                
-                # Limit number of files
-                if len(batch_files) >= max_files:
-                    break
-            
-            if len(batch_files) >= max_files:
-                break
+        # Report truncation explicitly so the remainder can be picked up by
+        # re-triggering with conf start_after=<next_start_after>
+        truncated = len(batch_files) > max_files
+        batch_files = batch_files[:max_files]
+        next_start_after = batch_files[-1]['key'] if truncated else None
+        if truncated:
+            logging.warning(f"Discovery stopped at max_files={max_files}; resume with "
+                            f"start_after={next_start_after}")
+        
+        total_size = sum(f['size'] for f in batch_files)
         
         logging.info(f"Found {len(batch_files)} files for batch processing "
                     f"(total size: {total_size / (1024**3):.2f} GB)")
@@ -129,16 +448,22 @@ def discover_batch_files(**context) -> Dict[str, Any]:
             batch = batch_files[i:i + BATCH_SIZE]
             batches.append({
                 'batch_id': f"batch_{i // BATCH_SIZE + 1:04d}",
-                'files': batch,
+                # Only (bucket, key) is needed downstream; sizes stay aggregated
+                'files': [(f['bucket'], f['key']) for f in batch],
                 'total_files': len(batch),
                 'total_size': sum(f['size'] for f in batch)
             })
         
+        manifest_key = _manifest_key(context, 'batches')
+        _write_manifest(s3_client, manifest_key, batches)
+        
         result = {
             'total_files': len(batch_files),
             'total_size': total_size,
             'num_batches': len(batches),
-            'batches': batches
+            'truncated': truncated,
+            'next_start_after': next_start_after,
+            'manifest_key': manifest_key
         }
         
         # Store for downstream tasks
@@ -150,12 +475,16 @@ def discover_batch_files(**context) -> Dict[str, Any]:
         logging.error(f"Error discovering batch files: {e}")
         raise AirflowException(f"Failed to discover batch files: {e}")
 
-def create_batch_jobs(**context) -> List[Dict]:
+def create_batch_jobs(**context) -> List[Dict[str, Any]]:
     """
     Create Kubernetes batch jobs for parallel processing.
+    
+    Each job spec is written to its own manifest; the returned list of
+    compact references drives the mapped process_batch task.
     """
     batch_discovery = context['task_instance'].xcom_pull(key='batch_discovery')
-    batches = batch_discovery['batches']
+    s3_client = get_s3_client()
+    batches = _read_manifest(s3_client, batch_discovery['manifest_key'])
     
     logging.info(f"Creating {len(batches)} batch jobs for parallel processing")
     
@@ -168,111 +497,192 @@ def create_batch_jobs(**context) -> List[Dict]:
             'job_name': f"astro-batch-{batch['batch_id']}-{context['ds_nodash']}",
             'status': 'CREATED'
         }
-        batch_jobs.append(job_spec)
-    
-    context['task_instance'].xcom_push(key='batch_jobs', value=batch_jobs)
+        
+        manifest_key = _manifest_key(context, f"batch_jobs/{batch['batch_id']}")
+        _write_manifest(s3_client, manifest_key, job_spec)
+        
+        batch_jobs.append({
+            'batch_id': batch['batch_id'],
+            'total_files': len(batch['files']),
+            'manifest_key': manifest_key
+        })
     
     return batch_jobs
 
-def process_batch_parallel(**context) -> Dict[str, Any]:
-    """
-    Process batches in parallel using ThreadPoolExecutor.
+def _build_job_request(bucket: str, key: str) -> Dict[str, Any]:
+    """Build the image-processor submission for a single file."""
+    return {
+        'inputBucket': bucket,
+        'inputObjectKey': key,
+        'outputBucket': S3_BUCKET_PROCESSED,
+        'processingType': 'FULL_CALIBRATION',
+        'priority': 3  # Lower priority for batch jobs
+    }
+
+def _submit_single_file(
+    file_ref: Tuple[str, str]
+) -> Tuple[Optional[str], Optional[str]]:
+    """Submit one (bucket, key) file; returns (job_id, error)."""
+    bucket, key = file_ref
+    try:
+        response = HTTP_SESSION.post(
+            f"{IMAGE_PROCESSOR_URL}/api/v1/processing/jobs/s3",
+            data=json_dumps(_build_job_request(bucket, key)),
+            headers=JSON_HEADERS,
+            timeout=30
+        )
+        
+        if response.status_code == 202:
+            return json_loads(response.content)['jobId'], None
+        return None, f"HTTP {response.status_code}"
+        
+    except Exception as e:
+        return None, str(e)
+
+def _submit_files_individually(
+    files: List[Tuple[str, str]]
+) -> Tuple[List[Dict], List[Dict]]:
+    """Submit files one request each (fallback path) on a bounded thread pool."""
+    processed_files = []
+    failed_files = []
+    
+    with ThreadPoolExecutor(max_workers=FILE_SUBMIT_WORKERS) as executor:
+        outcomes = executor.map(_submit_single_file, files)
+        for file_info, (job_id, error) in zip(files, outcomes):
+            if job_id:
+                processed_files.append({
+                    'file_info': file_info,
+                    'job_id': job_id,
+                    'status': 'SUBMITTED'
+                })
+            else:
+                failed_files.append({
+                    'file_info': file_info,
+                    'error': error
+                })
+    
+    return processed_files, failed_files
+
+def _batch_job_kwargs(batch_job: Dict) -> Dict[str, Any]:
+    """Wrap a batch job reference as op_kwargs for the mapped task."""
+    return {'batch_job': batch_job}
+
+def process_single_batch(batch_job: Dict, **context) -> Dict[str, Any]:
     """
-    batch_jobs = context['task_instance'].xcom_pull(key='batch_jobs')
+    Submit a single batch of files with one bulk request.
     
-    logging.info(f"Starting parallel processing of {len(batch_jobs)} batches")
+    Runs as one mapped task instance per batch, so batches are scheduled
+    across the worker pool and retried independently.
+    """
+    s3_client = get_s3_client()
+    job_spec = _read_manifest(s3_client, batch_job['manifest_key'])
+    batch_id = job_spec['batch_id']
+    files = job_spec['files']
+    
+    logging.info(f"Processing batch {batch_id} with {len(files)} files")
+    
+    # The batch endpoint keys each submission; the object key is unique per file
+    response = HTTP_SESSION.post(
+        f"{IMAGE_PROCESSOR_URL}/api/v1/processing/jobs/batch",
+        data=json_dumps({
+            key: _build_job_request(bucket, key) for bucket, key in files
+        }),
+        headers=JSON_HEADERS,
+        timeout=30 + len(files)
+    )
     
-    def process_single_batch(batch_job):
-        """Process a single batch of files."""
-        batch_id = batch_job['batch_id']
-        files = batch_job['files']
-        
-        logging.info(f"Processing batch {batch_id} with {len(files)} files")
-        
-        import requests
-        
+    if 400 <= response.status_code < 500:
+        logging.warning(f"Bulk submission rejected for batch {batch_id} "
+                        f"(HTTP {response.status_code}), submitting files individually")
+        processed_files, failed_files = _submit_files_individually(files)
+    elif response.status_code != 202:
+        raise AirflowException(
+            f"Bulk submission failed with HTTP {response.status_code}"
+        )
+    else:
+        job_ids = json_loads(response.content)
         processed_files = []
         failed_files = []
         
         for file_info in files:
-            try:
-                # Submit processing job
-                job_request = {
-                    'inputBucket': file_info['bucket'],
-                    'inputObjectKey': file_info['key'],
-                    'outputBucket': S3_BUCKET_PROCESSED,
-                    'processingType': 'FULL_CALIBRATION',
-                    'priority': 3  # Lower priority for batch jobs
-                }
-                
-                response = requests.post(
-                    f"{Variable.get('image_processor_url')}/api/v1/processing/jobs/s3",
-                    json=job_request,
-                    timeout=30
-                )
-                
-                if response.status_code == 202:
-                    job_data = response.json()
-                    processed_files.append({
-                        'file_info': file_info,
-                        'job_id': job_data['jobId'],
-                        'status': 'SUBMITTED'
-                    })
-                else:
-                    failed_files.append({
-                        'file_info': file_info,
-                        'error': f"HTTP {response.status_code}"
-                    })
-                    
-            except Exception as e:
+            job_id = job_ids.get(file_info[1])
+            if job_id:
+                processed_files.append({
+                    'file_info': file_info,
+                    'job_id': job_id,
+                    'status': 'SUBMITTED'
+                })
+            else:
                 failed_files.append({
                     'file_info': file_info,
-                    'error': str(e)
+                    'error': 'No job ID returned'
                 })
-        
-        return {
-            'batch_id': batch_id,
-            'processed_files': processed_files,
-            'failed_files': failed_files,
-            'success_count': len(processed_files),
-            'failure_count': len(failed_files)
-        }
     
-    # Process batches in parallel
+    result = {
+        'batch_id': batch_id,
+        'processed_files': processed_files,
+        'failed_files': failed_files,
+        'success_count': len(processed_files),
+        'failure_count': len(failed_files)
+    }
+    
+    results_key = _manifest_key(context, f"batch_results/{batch_id}")
+    _write_manifest(s3_client, results_key, result)
+    
+    logging.info(f"Completed batch {batch_id}: "
+                 f"{result['success_count']} success, {result['failure_count']} failed")
+    
+    return {
+        'batch_id': batch_id,
+        'success_count': result['success_count'],
+        'failure_count': result['failure_count'],
+        'results_key': results_key
+    }
+
+def summarize_batch_processing(**context) -> Dict[str, Any]:
+    """
+    Combine the mapped batch submissions into a single processing summary.
+    """
+    task_instance = context['task_instance']
+    batch_jobs = task_instance.xcom_pull(task_ids='create_batch_jobs')
+    outputs = task_instance.xcom_pull(task_ids='parallel_processing.process_batch')
+    batch_outputs = {
+        output['batch_id']: output
+        for output in outputs or []
+        if output
+    }
+    
+    s3_client = get_s3_client()
     results = []
-    with ThreadPoolExecutor(max_workers=MAX_PARALLEL_JOBS) as executor:
-        future_to_batch = {
-            executor.submit(process_single_batch, batch): batch
-            for batch in batch_jobs
-        }
-        
-        for future in as_completed(future_to_batch):
-            batch = future_to_batch[future]
-            try:
-                result = future.result()
-                results.append(result)
-                logging.info(f"Completed batch {result['batch_id']}: "
-                           f"{result['success_count']} success, {result['failure_count']} failed")
-            except Exception as e:
-                logging.error(f"Batch {batch['batch_id']} failed: {e}")
-                results.append({
-                    'batch_id': batch['batch_id'],
-                    'error': str(e),
-                    'success_count': 0,
-                    'failure_count': len(batch['files'])
-                })
+    
+    for batch_job in batch_jobs:
+        output = batch_outputs.get(batch_job['batch_id'])
+        if output:
+            results.append(_read_manifest(s3_client, output['results_key']))
+        else:
+            # Mapped instance failed after its retries; count every file as failed
+            logging.error(f"Batch {batch_job['batch_id']} did not complete")
+            results.append({
+                'batch_id': batch_job['batch_id'],
+                'error': 'Batch task failed',
+                'success_count': 0,
+                'failure_count': batch_job['total_files']
+            })
     
     # Aggregate results
     total_success = sum(r['success_count'] for r in results)
     total_failures = sum(r['failure_count'] for r in results)
     
+    results_key = _manifest_key(context, 'batch_results')
+    _write_manifest(s3_client, results_key, results)
+    
     summary = {
         'total_batches': len(batch_jobs),
         'completed_batches': len(results),
         'total_files_processed': total_success,
         'total_files_failed': total_failures,
         'success_rate': total_success / (total_success + total_failures) if (total_success + total_failures) > 0 else 0,
-        'batch_results': results
+        'results_key': results_key
     }
     
     logging.info(f"Batch processing complete: {total_success} successful, {total_failures} failed")
@@ -289,71 +699,87 @@ def monitor_batch_completion(**context) -> Dict[str, Any]:
     
     logging.info("Monitoring batch job completion")
     
-    import requests
     import time
     
-    all_job_ids = []
-    for batch_result in processing_summary['batch_results']:
-        if 'processed_files' in batch_result:
-            for file_result in batch_result['processed_files']:
-                all_job_ids.append(file_result['job_id'])
+    batch_results = _read_manifest(get_s3_client(), processing_summary['results_key'])
+    
+    # Job IDs are held in a set so finished jobs are dropped in O(1)
+    pending = {
+        file_result['job_id']
+        for batch_result in batch_results
+        for file_result in batch_result.get('processed_files', [])
+    }
     
-    if not all_job_ids:
+    if not pending:
         logging.info("No jobs to monitor")
-        return {'completed_jobs': 0, 'failed_jobs': 0}
+        result = {'completed_jobs': 0, 'failed_jobs': 0, 'pending_jobs': 0}
+        context['task_instance'].xcom_push(key='monitoring_result', value=result)
+        return result
     
-    logging.info(f"Monitoring {len(all_job_ids)} batch processing jobs")
+    logging.info(f"Monitoring {len(pending)} batch processing jobs")
     
     completed_jobs = 0
     failed_jobs = 0
     max_wait_time = 14400  # 4 hours maximum wait
-    check_interval = 60    # Check every minute
+    poll_interval = MIN_POLL_INTERVAL
     start_time = time.time()
     
-    while time.time() - start_time < max_wait_time:
-        pending_jobs = []
+    while pending and time.time() - start_time < max_wait_time:
+        pending_list = list(pending)
+        pending_before = len(pending)
         
-        for job_id in all_job_ids:
+        for i in range(0, len(pending_list), STATUS_BATCH_SIZE):
+            chunk = pending_list[i:i + STATUS_BATCH_SIZE]
             try:
-                response = requests.get(
-                    f"{Variable.get('image_processor_url')}/api/v1/processing/jobs/{job_id}",
-                    timeout=10
+                response = HTTP_SESSION.post(
+                    f"{IMAGE_PROCESSOR_URL}/api/v1/processing/jobs/status/batch",
+                    data=json_dumps(chunk),
+                    headers=JSON_HEADERS,
+                    timeout=30
                 )
                 
-                if response.status_code == 200:
-                    job_status = response.json()
-                    status = job_status['status']
-                    
+                if response.status_code != 200:
+                    logging.warning(f"Status lookup for {len(chunk)} jobs returned "
+                                    f"HTTP {response.status_code}")
+                    continue
+                
+                for job_id, status in json_loads(response.content).items():
+                    # Only count a job the first time it reaches a terminal state
+                    if job_id not in pending:
+                        continue
                     if status == 'COMPLETED':
                         completed_jobs += 1
-                        all_job_ids.remove(job_id)
+                        pending.discard(job_id)
                     elif status == 'FAILED':
                         failed_jobs += 1
-                        all_job_ids.remove(job_id)
-                    else:
-                        pending_jobs.append(job_id)
-                else:
-                    pending_jobs.append(job_id)
+                        pending.discard(job_id)
                     
             except Exception as e:
-                logging.warning(f"Error checking job {job_id}: {e}")
-                pending_jobs.append(job_id)
+                logging.warning(f"Error checking status of {len(chunk)} jobs: {e}")
         
-        if not pending_jobs:
+        if not pending:
             break
             
+        # Back off while nothing changes; poll quickly again once jobs finish
+        if len(pending) < pending_before:
+            poll_interval = MIN_POLL_INTERVAL
+        else:
+            poll_interval = min(poll_interval * 1.5, MAX_POLL_INTERVAL)
+        
         logging.info(f"Job status: {completed_jobs} completed, {failed_jobs} failed, "
-                    f"{len(pending_jobs)} pending")
-        time.sleep(check_interval)
+                    f"{len(pending)} pending; next check in {poll_interval:.0f}s")
+        time.sleep(poll_interval)
     
     result = {
         'completed_jobs': completed_jobs,
         'failed_jobs': failed_jobs,
-        'pending_jobs': len(all_job_ids)
+        'pending_jobs': len(pending)
     }
     
     logging.info(f"Monitoring complete: {completed_jobs} completed, "
-                f"{failed_jobs} failed, {len(all_job_ids)} still pending")
+                f"{failed_jobs} failed, {len(pending)} still pending")
+    
+    context['task_instance'].xcom_push(key='monitoring_result', value=result)
     
     return result
 
@@ -365,6 +791,11 @@ def generate_batch_report(**context) -> str:
     processing_summary = context['task_instance'].xcom_pull(key='processing_summary')
     completion_result = context['task_instance'].xcom_pull(key='monitoring_result')
     
+    s3_client = get_s3_client()
+    batch_results = _read_manifest(s3_client, processing_summary['results_key'])
+    truncated = batch_discovery['truncated']
+    next_start_after = batch_discovery['next_start_after']
+    
     report = f"""
     Batch Processing Report
     ======================
@@ -377,6 +808,7 @@ def generate_batch_report(**context) -> str:
     - Total data size: {batch_discovery['total_size'] / (1024**3):.2f} GB
     - Number of batches: {batch_discovery['num_batches']}
     - Batch size: {BATCH_SIZE} files per batch
+    - Truncated at max_files: {truncated} (next start_after: {next_start_after})
     
     Processing Results:
     - Files submitted: {processing_summary['total_files_processed']}
@@ -391,25 +823,28 @@ def generate_batch_report(**context) -> str:
     Batch Details:
     """
     
-    for batch_result in processing_summary['batch_results']:
-        batch_id = batch_result['batch_id']
-        success_count = batch_result['success_count']
-        failure_count = batch_result['failure_count']
-        
-        report += f"\n    {batch_id}: {success_count} success, {failure_count} failed"
+    # Join once; repeated += is quadratic in the number of batches
+    report = "\n".join([report] + [
+        f"    {r['batch_id']}: {r['success_count']} success, "
+        f"{r['failure_count']} failed"
+        for r in batch_results
+    ])
     
     logging.info(f"Generated batch processing report:\n{report}")
     
     # Save report to S3
     try:
-        s3_client = boto3.client('s3')
-        report_key = f"reports/batch_processing/{context['ds']}/{context['dag_run'].run_id}_report.txt"
+        report_key = (f"reports/batch_processing/{context['ds']}/"
+                      f"{context['dag_run'].run_id}_report.txt.gz")
+        body = gzip.compress(report.encode('utf-8'), compresslevel=6)
         
-        s3_client.put_object(
-            Bucket=S3_BUCKET_PROCESSED,
-            Key=report_key,
-            Body=report.encode('utf-8'),
-            ContentType='text/plain'
+        # upload_fileobj switches to a parallel multipart upload above the threshold
+        s3_client.upload_fileobj(
+            io.BytesIO(body),
+            S3_BUCKET_PROCESSED,
+            report_key,
+            ExtraArgs={'ContentType': 'text/plain', 'ContentEncoding': 'gzip'},
+            Config=REPORT_TRANSFER_CONFIG
         )
         
         logging.info(f"Saved report to s3://{S3_BUCKET_PROCESSED}/{report_key}")
@@ -433,13 +868,20 @@ create_jobs_task = PythonOperator(
     dag=dag,
 )
 
-# Parallel processing group
+# Parallel processing group: one mapped task instance per batch
 with TaskGroup('parallel_processing', dag=dag) as processing_group:
     
-    process_task = PythonOperator(
-        task_id='process_batches_parallel',
-        python_callable=process_batch_parallel,
+    process_task = PythonOperator.partial(
+        task_id='process_batch',
+        python_callable=process_single_batch,
         pool='batch_processing_pool',  # Use dedicated resource pool
+        max_active_tis_per_dag=MAX_PARALLEL_JOBS,
+    ).expand(op_kwargs=create_jobs_task.output.map(_batch_job_kwargs))
+    
+    summarize_task = PythonOperator(
+        task_id='summarize_batch_processing',
+        python_callable=summarize_batch_processing,
+        trigger_rule='all_done',  # Summarize even if some batches failed
     )
     
     monitor_task = PythonOperator(
@@ -447,7 +889,7 @@ with TaskGroup('parallel_processing', dag=dag) as processing_group:
         python_callable=monitor_batch_completion,
     )
     
-    process_task >> monitor_task
+    process_task >> summarize_task >> monitor_task
 
 # Cleanup and validation
 cleanup_task = PostgresOperator(
@@ -8,27 +8,31 @@ and catalog consistency.
 Author: STScI Demo Project
 """
 
-from datetime import datetime, timedelta
-from typing import Dict, Any, List
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Dict, Any, List, Optional
 
 from airflow import DAG
-from airflow.operators.python import PythonOperator, BranchPythonOperator
-from airflow.operators.bash import BashOperator
+from airflow.operators.python import (
+    PythonOperator, BranchPythonOperator, ShortCircuitOperator
+)
 from airflow.providers.postgres.operators.postgres import PostgresOperator
 from airflow.providers.postgres.hooks.postgres import PostgresHook
-from airflow.providers.http.sensors.http import HttpSensor
 from airflow.operators.email import EmailOperator
 from airflow.operators.dummy import DummyOperator
 from airflow.utils.dates import days_ago
 from airflow.utils.task_group import TaskGroup
 from airflow.models import Variable
+from airflow.stats import Stats
 from airflow.exceptions import AirflowException
+from airflow.plugins.pipeline_common import get_s3_client
 
-import boto3
+import asyncio
+import gzip
 import json
 import logging
-import pandas as pd
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
 
 # Default arguments
 default_args = {
@@ -63,6 +67,44 @@ QUALITY_THRESHOLDS = {
     'max_duplicate_objects': 0.05
 }
 
+# Numeric severity per metric status, for gauges
+STATUS_LEVELS = {
+    'PASS': 0,
+    'WARNING': 1,
+    'CRITICAL': 2
+}
+
+# Report icon per metric status
+STATUS_ICONS = {
+    'PASS': '✓',
+    'WARNING': '⚠',
+    'CRITICAL': '✗'
+}
+
+# Airflow pools capping concurrent queries per database (2 slots each):
+#   airflow pools set astro_processing_db_pool 2 "Processing DB quality queries"
+#   airflow pools set astro_catalog_db_pool 2 "Catalog DB quality queries"
+PROCESSING_DB_POOL = 'astro_processing_db_pool'
+CATALOG_DB_POOL = 'astro_catalog_db_pool'
+
+@lru_cache(maxsize=None)
+def _var(name: str, default: Optional[str] = None) -> Optional[str]:
+    """
+    Airflow Variable lookup, memoised so each name hits the metadata DB once
+    per process.
+    """
+    return Variable.get(name, default)
+
+def _hour_cutoff(hours: int) -> datetime:
+    """
+    Naive UTC timestamp truncated to the hour, ``hours`` ago.
+
+    Passed as a query parameter so range predicates compare the indexed
+    column against a constant.
+    """
+    now = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+    return now - timedelta(hours=hours)
+
 @dataclass
 class QualityMetric:
     name: str
@@ -71,44 +113,96 @@ class QualityMetric:
     status: str  # 'PASS', 'WARNING', 'CRITICAL'
     description: str
 
+# Gateway statuses worth retrying before declaring a service unhealthy
+RETRYABLE_HEALTH_STATUSES = (502, 503, 504)
+HEALTH_PROBE_ATTEMPTS = 3
+
+async def _probe_service(session, service_name: str, base_url: str) -> bool:
+    """Return True if the service's actuator health endpoint reports UP."""
+    try:
+        for attempt in range(HEALTH_PROBE_ATTEMPTS):
+            async with session.get(f"{base_url}/actuator/health") as response:
+                retryable = response.status in RETRYABLE_HEALTH_STATUSES
+                if retryable and attempt < HEALTH_PROBE_ATTEMPTS - 1:
+                    await asyncio.sleep(0.2 * 2 ** attempt)
+                    continue
+                
+                if response.status == 200:
+                    health_data = await response.json(content_type=None)
+                    is_healthy = health_data.get('status') == 'UP'
+                    
+                    if is_healthy:
+                        logging.info(f"Service {service_name} is healthy")
+                    else:
+                        logging.warning(f"Service {service_name} reports unhealthy "
+                                        f"status: {health_data}")
+                    return is_healthy
+                
+                logging.error(f"Service {service_name} health check failed: "
+                              f"HTTP {response.status}")
+                return False
+        
+    except Exception as e:
+        logging.error(f"Service {service_name} health check error: {e}")
+    
+    return False
+
+async def _probe_services(services: Dict[str, str]) -> Dict[str, bool]:
+    """Probe every service over one client session and gather the results."""
+    import aiohttp
+    
+    connector = aiohttp.TCPConnector(limit=32, ttl_dns_cache=300)
+    timeout = aiohttp.ClientTimeout(total=8)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        results = await asyncio.gather(*(
+            _probe_service(session, service_name, base_url)
+            for service_name, base_url in services.items()
+        ))
+    return dict(zip(services, results))
+
+def _emit_metrics(metrics: List[QualityMetric]) -> None:
+    """
+    Publish each metric as a StatsD gauge through Airflow's metrics client.
+    
+    Gauges are named data_quality.<metric> and data_quality.<metric>.status
+    (0 = PASS, 1 = WARNING, 2 = CRITICAL) under Airflow's configured prefix,
+    so dashboards need not wait for the report. A no-op when Airflow
+    metrics are disabled.
+    """
+    for m in metrics:
+        try:
+            Stats.gauge(f'data_quality.{m.name}', float(m.value))
+            Stats.gauge(f'data_quality.{m.name}.status', STATUS_LEVELS.get(m.status, 2))
+        except Exception as e:
+            logging.warning(f"Failed to emit metric {m.name}: {e}")
+
+def _push_metrics(ti, key: str, metrics: List[QualityMetric]) -> None:
+    """Push metrics as one compact JSON string rather than a list of dicts."""
+    ti.xcom_push(key=key, value=json.dumps(
+        [asdict(m) for m in metrics], separators=(',', ':'), default=float
+    ))
+
+def _pull_metrics(ti, key: str) -> List[Dict[str, Any]]:
+    """Inverse of _push_metrics; an absent key yields an empty list."""
+    blob = ti.xcom_pull(key=key)
+    return json.loads(blob) if blob else []
+
 def check_service_health(**context) -> Dict[str, bool]:
     """
     Check health status of all pipeline services.
+    
+    Services are probed concurrently, so the task takes as long as the
+    slowest probe rather than the sum of all of them.
     """
     logging.info("Checking service health status")
     
-    import requests
-    
     services = {
-        'image_processor': Variable.get('image_processor_url', 'http://image-processor-service:8080'),
-        'catalog_service': Variable.get('catalog_service_url', 'http://catalog-service:8080'),
+        'image_processor': _var('image_processor_url',
+                                'http://image-processor-service:8080'),
+        'catalog_service': _var('catalog_service_url', 'http://catalog-service:8080'),
     }
     
-    health_status = {}
-    
-    for service_name, base_url in services.items():
-        try:
-            response = requests.get(
-                f"{base_url}/actuator/health",
-                timeout=10
-            )
-            
-            if response.status_code == 200:
-                health_data = response.json()
-                is_healthy = health_data.get('status') == 'UP'
-                health_status[service_name] = is_healthy
-                
-                if is_healthy:
-                    logging.info(f"Service {service_name} is healthy")
-                else:
-                    logging.warning(f"Service {service_name} reports unhealthy status: {health_data}")
-            else:
-                health_status[service_name] = False
-                logging.error(f"Service {service_name} health check failed: HTTP {response.status_code}")
-                
-        except Exception as e:
-            health_status[service_name] = False
-            logging.error(f"Service {service_name} health check error: {e}")
+    health_status = asyncio.run(_probe_services(services))
     
     context['task_instance'].xcom_push(key='service_health', value=health_status)
     
@@ -120,6 +214,22 @@ def check_service_health(**context) -> Dict[str, bool]:
     
     return health_status
 
+def service_health_gate(**context) -> bool:
+    """
+    Run the service health check and decide whether quality analysis runs.
+    
+    Returning False when every service is down short-circuits the rest of
+    the DAG, sparing the databases and worker slots a run whose results
+    would only restate the outage.
+    """
+    health_status = check_service_health(**context)
+    
+    if not any(health_status.values()):
+        logging.error("All services are unhealthy, skipping quality analysis")
+        return False
+    
+    return True
+
 def analyze_processing_performance(**context) -> List[QualityMetric]:
     """
     Analyze processing job performance metrics.
@@ -132,17 +242,19 @@ def analyze_processing_performance(**context) -> List[QualityMetric]:
     sql = """
     SELECT 
         COUNT(*) as total_jobs,
-        COUNT(CASE WHEN status = 'COMPLETED' THEN 1 END) as completed_jobs,
-        COUNT(CASE WHEN status = 'FAILED' THEN 1 END) as failed_jobs,
-        AVG(EXTRACT(EPOCH FROM (completed_at - started_at))/3600.0) as avg_processing_hours,
-        MAX(EXTRACT(EPOCH FROM (completed_at - started_at))/3600.0) as max_processing_hours,
-        COUNT(CASE WHEN retry_count > 0 THEN 1 END) as jobs_with_retries
+        COUNT(*) FILTER (WHERE status = 'COMPLETED') as completed_jobs,
+        COUNT(*) FILTER (WHERE status = 'FAILED') as failed_jobs,
+        AVG(EXTRACT(EPOCH FROM (completed_at - started_at))/3600.0)
+            FILTER (WHERE status = 'COMPLETED') as avg_processing_hours,
+        MAX(EXTRACT(EPOCH FROM (completed_at - started_at))/3600.0)
+            FILTER (WHERE status = 'COMPLETED') as max_processing_hours,
+        COUNT(*) FILTER (WHERE retry_count > 0) as jobs_with_retries
     FROM processing_jobs 
-    WHERE created_at >= NOW() - INTERVAL '24 hours'
+    WHERE created_at >= %s
     """
     
     try:
-        result = postgres_hook.get_first(sql)
+        result = postgres_hook.get_first(sql, parameters=(_hour_cutoff(24),))
         
         if result and result[0] > 0:  # total_jobs > 0
             total_jobs, completed_jobs, failed_jobs, avg_hours, max_hours, retries = result
@@ -177,7 +289,7 @@ def analyze_processing_performance(**context) -> List[QualityMetric]:
                     value=avg_hours or 0,
                     threshold=QUALITY_THRESHOLDS['max_processing_time_hours'],
                     status='PASS' if (avg_hours or 0) <= QUALITY_THRESHOLDS['max_processing_time_hours'] else 'WARNING',
-                    description=f'{avg_hours:.2f} hours average processing time'
+                    description=f'{avg_hours or 0:.2f} hours average processing time'
                 )
             ]
         else:
@@ -204,13 +316,104 @@ def analyze_processing_performance(**context) -> List[QualityMetric]:
             )
         ]
     
-    context['task_instance'].xcom_push(key='processing_metrics', value=[
-        {'name': m.name, 'value': m.value, 'threshold': m.threshold, 
-         'status': m.status, 'description': m.description} for m in metrics
-    ])
+    _emit_metrics(metrics)
+    _push_metrics(context['task_instance'], 'processing_metrics', metrics)
     
     return metrics
 
+# Objects closer than this (degrees, ~0.13 arcsec) count as potential duplicates
+DUPLICATE_RADIUS_DEG = 0.000036
+
+# Every catalog counter comes from this one statement. Completeness and
+# coordinate counters are read from the hourly catalog_quality_agg view; the
+# last-hour growth count is exact, served by the created_at index.
+# Duplicates are objects with a later-inserted neighbour within
+# DUPLICATE_RADIUS_DEG, found through the GiST index on position; the planar
+# degree distance is at least the true separation, so this never over-counts.
+# Add new counters here rather than issuing another scan of astronomical_objects.
+CATALOG_AGGREGATES_SQL = """
+WITH stats AS (
+    SELECT
+        COALESCE(SUM(n), 0)::bigint as total_objects,
+        (
+            SELECT COUNT(*)
+            FROM astronomical_objects
+            WHERE created_at >= NOW() - INTERVAL '1 hour'
+        )::bigint as recent_objects,
+        COALESCE(SUM(n_no_mag), 0)::bigint as objects_without_magnitude,
+        COALESCE(SUM(n_bad_coords), 0)::bigint as invalid_coords,
+        COALESCE(SUM(n_with_coords), 0)::bigint as total_with_coords
+    FROM catalog_quality_agg
+),
+dups AS (
+    SELECT COUNT(*) as potential_duplicates
+    FROM astronomical_objects a
+    WHERE EXISTS (
+        SELECT 1
+        FROM astronomical_objects b
+        WHERE b.id > a.id
+          AND ST_DWithin(a.position, b.position, %(duplicate_radius_deg)s)
+    )
+)
+SELECT * FROM stats, dups
+"""
+
+@dataclass
+class CatalogAggregates:
+    """Shared catalog counters, in CATALOG_AGGREGATES_SQL column order."""
+    total_objects: int
+    recent_objects: int
+    no_magnitude: int
+    invalid_coords: int
+    total_with_coords: int
+    potential_duplicates: int
+
+def _catalog_metrics(agg: CatalogAggregates) -> List[QualityMetric]:
+    """Derive the catalog quality metrics from one set of aggregates."""
+    total = agg.total_objects
+    missing_magnitude_rate = agg.no_magnitude / total if total > 0 else 1
+    duplicate_rate = agg.potential_duplicates / total if total > 0 else 0
+    coord_validity = (
+        1 - (agg.invalid_coords / agg.total_with_coords)
+        if agg.total_with_coords > 0 else 1
+    )
+    min_recent_objects = QUALITY_THRESHOLDS['min_catalog_objects_per_hour']
+    magnitude_pct = (total - agg.no_magnitude) / total * 100 if total > 0 else 0
+    
+    return [
+        QualityMetric(
+            name='catalog_growth_rate',
+            value=agg.recent_objects,
+            threshold=min_recent_objects,
+            status='PASS' if agg.recent_objects >= min_recent_objects else 'WARNING',
+            description=f'{agg.recent_objects} objects added in last hour'
+        ),
+        QualityMetric(
+            name='catalog_completeness',
+            value=1 - missing_magnitude_rate if total > 0 else 0,
+            threshold=0.8,
+            status='PASS' if missing_magnitude_rate <= 0.2 else 'WARNING',
+            description=f'{magnitude_pct:.1f}% objects have magnitude measurements'
+        ),
+        QualityMetric(
+            name='duplicate_object_rate',
+            value=duplicate_rate,
+            threshold=QUALITY_THRESHOLDS['max_duplicate_objects'],
+            status=(
+                'PASS' if duplicate_rate <= QUALITY_THRESHOLDS['max_duplicate_objects']
+                else 'WARNING'
+            ),
+            description=f'{duplicate_rate:.2%} potential duplicate objects'
+        ),
+        QualityMetric(
+            name='coordinate_validity',
+            value=coord_validity,
+            threshold=0.99,
+            status='PASS' if coord_validity >= 0.99 else 'CRITICAL',
+            description=f'{coord_validity:.2%} coordinates are valid'
+        ),
+    ]
+
 def analyze_catalog_quality(**context) -> List[QualityMetric]:
     """
     Analyze astronomical catalog data quality.
@@ -222,84 +425,12 @@ def analyze_catalog_quality(**context) -> List[QualityMetric]:
     metrics = []
     
     try:
-        # Check catalog growth rate
-        growth_sql = """
-        SELECT 
-            COUNT(*) as total_objects,
-            COUNT(CASE WHEN created_at >= NOW() - INTERVAL '1 hour' THEN 1 END) as recent_objects,
-            COUNT(DISTINCT object_type) as object_types,
-            COUNT(CASE WHEN magnitude IS NULL THEN 1 END) as objects_without_magnitude
-        FROM astronomical_objects
-        """
-        
-        result = postgres_hook.get_first(growth_sql)
+        result = postgres_hook.get_first(
+            CATALOG_AGGREGATES_SQL,
+            parameters={'duplicate_radius_deg': DUPLICATE_RADIUS_DEG}
+        )
         if result:
-            total_objects, recent_objects, object_types, no_magnitude = result
-            
-            metrics.append(QualityMetric(
-                name='catalog_growth_rate',
-                value=recent_objects,
-                threshold=QUALITY_THRESHOLDS['min_catalog_objects_per_hour'],
-                status='PASS' if recent_objects >= QUALITY_THRESHOLDS['min_catalog_objects_per_hour'] else 'WARNING',
-                description=f'{recent_objects} objects added in last hour'
-            ))
-            
-            metrics.append(QualityMetric(
-                name='catalog_completeness',
-                value=1 - (no_magnitude / total_objects) if total_objects > 0 else 0,
-                threshold=0.8,
-                status='PASS' if (no_magnitude / total_objects if total_objects > 0 else 1) <= 0.2 else 'WARNING',
-                description=f'{((total_objects - no_magnitude) / total_objects * 100) if total_objects > 0 else 0:.1f}% objects have magnitude measurements'
-            ))
-        
-        # Check for duplicate objects
-        duplicate_sql = """
-        SELECT COUNT(*) as potential_duplicates
-        FROM (
-            SELECT ra, dec, COUNT(*)
-            FROM astronomical_objects
-            WHERE ra IS NOT NULL AND dec IS NOT NULL
-            GROUP BY ROUND(ra::numeric, 4), ROUND(dec::numeric, 4)
-            HAVING COUNT(*) > 1
-        ) dup_coords
-        """
-        
-        dup_result = postgres_hook.get_first(duplicate_sql)
-        if dup_result:
-            potential_duplicates = dup_result[0]
-            duplicate_rate = potential_duplicates / total_objects if total_objects > 0 else 0
-            
-            metrics.append(QualityMetric(
-                name='duplicate_object_rate',
-                value=duplicate_rate,
-                threshold=QUALITY_THRESHOLDS['max_duplicate_objects'],
-                status='PASS' if duplicate_rate <= QUALITY_THRESHOLDS['max_duplicate_objects'] else 'WARNING',
-                description=f'{duplicate_rate:.2%} potential duplicate objects'
-            ))
-        
-        # Check coordinate validity
-        coord_sql = """
-        SELECT 
-            COUNT(CASE WHEN ra < 0 OR ra >= 360 THEN 1 END) as invalid_ra,
-            COUNT(CASE WHEN dec < -90 OR dec > 90 THEN 1 END) as invalid_dec,
-            COUNT(*) as total_with_coords
-        FROM astronomical_objects 
-        WHERE ra IS NOT NULL AND dec IS NOT NULL
-        """
-        
-        coord_result = postgres_hook.get_first(coord_sql)
-        if coord_result:
-            invalid_ra, invalid_dec, total_coords = coord_result
-            invalid_coords = invalid_ra + invalid_dec
-            coord_validity = 1 - (invalid_coords / total_coords) if total_coords > 0 else 1
-            
-            metrics.append(QualityMetric(
-                name='coordinate_validity',
-                value=coord_validity,
-                threshold=0.99,
-                status='PASS' if coord_validity >= 0.99 else 'CRITICAL',
-                description=f'{coord_validity:.2%} coordinates are valid'
-            ))
+            metrics = _catalog_metrics(CatalogAggregates(*result))
             
     except Exception as e:
         logging.error(f"Error analyzing catalog quality: {e}")
@@ -311,44 +442,64 @@ def analyze_catalog_quality(**context) -> List[QualityMetric]:
             description=f'Failed to analyze catalog quality: {e}'
         ))
     
-    context['task_instance'].xcom_push(key='catalog_metrics', value=[
-        {'name': m.name, 'value': m.value, 'threshold': m.threshold, 
-         'status': m.status, 'description': m.description} for m in metrics
-    ])
+    _emit_metrics(metrics)
+    _push_metrics(context['task_instance'], 'catalog_metrics', metrics)
     
     return metrics
 
+def count_completed_jobs(**context) -> Optional[int]:
+    """
+    Count processing jobs completed in the last 24 hours.
+    
+    Returns None if the processing database could not be queried.
+    """
+    processing_hook = PostgresHook(postgres_conn_id='astro_processing_db')
+    sql = ("SELECT COUNT(*) FROM processing_jobs "
+           "WHERE status = 'COMPLETED' AND completed_at >= %s")
+    
+    try:
+        return processing_hook.get_first(sql, parameters=(_hour_cutoff(24),))[0]
+    except Exception as e:
+        logging.error(f"Error counting completed jobs: {e}")
+        return None
+
+def count_recent_catalog_objects(**context) -> Optional[int]:
+    """
+    Count catalog objects created in the last 24 hours.
+    
+    Returns None if the catalog database could not be queried.
+    """
+    catalog_hook = PostgresHook(postgres_conn_id='astro_catalog_db')
+    sql = ("SELECT COALESCE(SUM(n), 0)::bigint FROM catalog_quality_agg "
+           "WHERE bucket >= %s")
+    
+    try:
+        cutoff = _hour_cutoff(24).replace(tzinfo=timezone.utc)
+        return catalog_hook.get_first(sql, parameters=(cutoff,))[0]
+    except Exception as e:
+        logging.error(f"Error counting recent catalog objects: {e}")
+        return None
+
 def check_data_consistency(**context) -> List[QualityMetric]:
     """
     Check consistency between processing jobs and catalog entries.
+    
+    Combines the counts gathered by count_completed_jobs and
+    count_recent_catalog_objects, which run in their own database pools.
     """
     logging.info("Checking data consistency across systems")
     
-    processing_hook = PostgresHook(postgres_conn_id='astro_processing_db')
-    catalog_hook = PostgresHook(postgres_conn_id='astro_catalog_db')
+    ti = context['task_instance']
+    processing_count = ti.xcom_pull(task_ids='quality_analysis.count_completed_jobs')
+    catalog_count = ti.xcom_pull(
+        task_ids='quality_analysis.count_recent_catalog_objects'
+    )
     
     metrics = []
     
     try:
-        # Check if completed jobs have corresponding catalog entries
-        consistency_sql = """
-        SELECT 
-            COUNT(CASE WHEN pj.status = 'COMPLETED' THEN 1 END) as completed_jobs,
-            COUNT(CASE WHEN pj.status = 'COMPLETED' AND ao.id IS NOT NULL THEN 1 END) as jobs_with_catalog_data
-        FROM processing_jobs pj
-        LEFT JOIN detections d ON pj.job_id = d.processing_job_id
-        LEFT JOIN astronomical_objects ao ON d.object_id = ao.id
-        WHERE pj.completed_at >= NOW() - INTERVAL '24 hours'
-        """
-        
-        # This is a simplified check - in reality, the join would be more complex
-        # For demo purposes, we'll check basic consistency
-        
-        processing_count_sql = "SELECT COUNT(*) FROM processing_jobs WHERE status = 'COMPLETED' AND completed_at >= NOW() - INTERVAL '24 hours'"
-        catalog_count_sql = "SELECT COUNT(*) FROM astronomical_objects WHERE created_at >= NOW() - INTERVAL '24 hours'"
-        
-        processing_count = processing_hook.get_first(processing_count_sql)[0]
-        catalog_count = catalog_hook.get_first(catalog_count_sql)[0]
+        if processing_count is None or catalog_count is None:
+            raise AirflowException("completed job or catalog object count unavailable")
         
         # Expect some ratio of catalog objects to completed jobs
         expected_ratio = 50  # Expect ~50 objects per completed job on average
@@ -374,10 +525,8 @@ def check_data_consistency(**context) -> List[QualityMetric]:
             description=f'Failed to check data consistency: {e}'
         ))
     
-    context['task_instance'].xcom_push(key='consistency_metrics', value=[
-        {'name': m.name, 'value': m.value, 'threshold': m.threshold, 
-         'status': m.status, 'description': m.description} for m in metrics
-    ])
+    _emit_metrics(metrics)
+    _push_metrics(context['task_instance'], 'consistency_metrics', metrics)
     
     return metrics
 
@@ -388,16 +537,17 @@ def evaluate_overall_quality(**context) -> str:
     logging.info("Evaluating overall pipeline quality")
     
     # Collect all metrics from previous tasks
-    processing_metrics = context['task_instance'].xcom_pull(key='processing_metrics') or []
-    catalog_metrics = context['task_instance'].xcom_pull(key='catalog_metrics') or []
-    consistency_metrics = context['task_instance'].xcom_pull(key='consistency_metrics') or []
+    processing_metrics = _pull_metrics(context['task_instance'], 'processing_metrics')
+    catalog_metrics = _pull_metrics(context['task_instance'], 'catalog_metrics')
+    consistency_metrics = _pull_metrics(context['task_instance'], 'consistency_metrics')
     
     all_metrics = processing_metrics + catalog_metrics + consistency_metrics
     
-    # Count metrics by status
-    critical_count = sum(1 for m in all_metrics if m['status'] == 'CRITICAL')
-    warning_count = sum(1 for m in all_metrics if m['status'] == 'WARNING')
-    pass_count = sum(1 for m in all_metrics if m['status'] == 'PASS')
+    # Count metrics by status in a single pass
+    status_counts = Counter(m['status'] for m in all_metrics)
+    critical_count = status_counts['CRITICAL']
+    warning_count = status_counts['WARNING']
+    pass_count = status_counts['PASS']
     
     total_metrics = len(all_metrics)
     
@@ -423,6 +573,15 @@ def evaluate_overall_quality(**context) -> str:
     
     context['task_instance'].xcom_push(key='quality_summary', value=quality_summary)
     
+    # Small counts-only payload for the alert email templates
+    context['task_instance'].xcom_push(key='quality_counts', value={
+        'overall': overall_status,
+        'total': total_metrics,
+        'critical': critical_count,
+        'warning': warning_count,
+        'pass': pass_count
+    })
+    
     logging.info(f"Overall quality status: {overall_status} "
                 f"({critical_count} critical, {warning_count} warnings, {pass_count} pass)")
     
@@ -435,7 +594,7 @@ def generate_quality_report(**context) -> str:
     quality_summary = context['task_instance'].xcom_pull(key='quality_summary')
     service_health = context['task_instance'].xcom_pull(key='service_health')
     
-    report = f"""
+    parts = [f"""
 Data Quality Report - {context['ds']}
 {'='*50}
 
@@ -444,13 +603,13 @@ Execution Time: {datetime.now().isoformat()}
 
 Service Health:
 {'-'*20}
-"""
+"""]
     
     for service, status in service_health.items():
         status_text = "✓ Healthy" if status else "✗ Unhealthy"
-        report += f"  {service}: {status_text}\n"
+        parts.append(f"  {service}: {status_text}\n")
     
-    report += f"""
+    parts.append(f"""
 Quality Metrics Summary:
 {'-'*25}
   Total Checks: {quality_summary['total_metrics']}
@@ -460,29 +619,28 @@ Quality Metrics Summary:
 
 Detailed Metrics:
 {'-'*20}
-"""
+""")
     
     for metric in quality_summary['metrics']:
-        status_icon = {
-            'PASS': '✓',
-            'WARNING': '⚠',
-            'CRITICAL': '✗'
-        }.get(metric['status'], '?')
-        
-        report += f"  {status_icon} {metric['name']}: {metric['description']}\n"
+        status_icon = STATUS_ICONS.get(metric['status'], '?')
+        parts.append(f"  {status_icon} {metric['name']}: {metric['description']}\n")
+    
+    report = "".join(parts)
     
     logging.info(f"Generated quality report:\n{report}")
     
     # Save report to S3
     try:
-        s3_client = boto3.client('s3')
-        report_key = f"quality-reports/{context['ds']}/quality_report_{context['ts_nodash']}.txt"
+        s3_client = get_s3_client()
+        report_key = (f"quality-reports/{context['ds']}/"
+                      f"quality_report_{context['ts_nodash']}.txt.gz")
         
         s3_client.put_object(
-            Bucket=Variable.get('s3_bucket_processed'),
+            Bucket=_var('s3_bucket_processed'),
             Key=report_key,
-            Body=report.encode('utf-8'),
-            ContentType='text/plain'
+            Body=gzip.compress(report.encode('utf-8')),
+            ContentType='text/plain',
+            ContentEncoding='gzip'
         )
         
         logging.info(f"Saved quality report to S3: {report_key}")
@@ -494,32 +652,63 @@ Detailed Metrics:
 
 # Task definitions
 
-# Service health checks
-health_check_task = PythonOperator(
+# Service health checks; skips everything downstream when all services are down
+health_check_task = ShortCircuitOperator(
     task_id='check_service_health',
-    python_callable=check_service_health,
+    python_callable=service_health_gate,
     dag=dag,
 )
 
 # Quality analysis tasks
 with TaskGroup('quality_analysis', dag=dag) as quality_group:
     
+    refresh_catalog_agg = PostgresOperator(
+        task_id='refresh_catalog_agg',
+        postgres_conn_id='astro_catalog_db',
+        sql='REFRESH MATERIALIZED VIEW CONCURRENTLY catalog_quality_agg;',
+        autocommit=True,
+        pool=CATALOG_DB_POOL,
+        pool_slots=1,
+    )
+    
     processing_analysis = PythonOperator(
         task_id='analyze_processing_performance',
         python_callable=analyze_processing_performance,
+        do_xcom_push=False,
+        pool=PROCESSING_DB_POOL,
+        pool_slots=1,
     )
     
     catalog_analysis = PythonOperator(
         task_id='analyze_catalog_quality',
         python_callable=analyze_catalog_quality,
+        do_xcom_push=False,
+        pool=CATALOG_DB_POOL,
+        pool_slots=1,
+    )
+    
+    completed_jobs_count = PythonOperator(
+        task_id='count_completed_jobs',
+        python_callable=count_completed_jobs,
+        pool=PROCESSING_DB_POOL,
+        pool_slots=1,
+    )
+    
+    catalog_objects_count = PythonOperator(
+        task_id='count_recent_catalog_objects',
+        python_callable=count_recent_catalog_objects,
+        pool=CATALOG_DB_POOL,
+        pool_slots=1,
     )
     
     consistency_check = PythonOperator(
         task_id='check_data_consistency',
         python_callable=check_data_consistency,
+        do_xcom_push=False,
     )
     
-    [processing_analysis, catalog_analysis, consistency_check]
+    refresh_catalog_agg >> [catalog_analysis, catalog_objects_count]
+    [completed_jobs_count, catalog_objects_count] >> consistency_check
 
 # Overall evaluation
 evaluate_task = BranchPythonOperator(
@@ -537,7 +726,9 @@ critical_alert = EmailOperator(
     <h2 style="color: red;">CRITICAL Data Quality Alert</h2>
     <p>Critical data quality issues have been detected in the astronomical data pipeline.</p>
     <p><strong>Execution Date:</strong> {{ ds }}</p>
-    <p><strong>Issues:</strong> {{ task_instance.xcom_pull(key='quality_summary')['critical_issues'] }} critical issues found</p>
+    <p><strong>Issues:</strong>
+    {{ ti.xcom_pull(task_ids='evaluate_overall_quality',
+                    key='quality_counts')['critical'] }} critical issues found</p>
     <p>Please investigate immediately and check the detailed quality report.</p>
     """,
     dag=dag,
@@ -551,7 +742,9 @@ warning_alert = EmailOperator(
     <h2 style="color: orange;">Data Quality Warning</h2>
     <p>Data quality warnings have been detected in the astronomical data pipeline.</p>
     <p><strong>Execution Date:</strong> {{ ds }}</p>
-    <p><strong>Warnings:</strong> {{ task_instance.xcom_pull(key='quality_summary')['warnings'] }} warnings found</p>
+    <p><strong>Warnings:</strong>
+    {{ ti.xcom_pull(task_ids='evaluate_overall_quality',
+                    key='quality_counts')['warning'] }} warnings found</p>
     <p>Please review the quality report and consider investigation.</p>
     """,
     dag=dag,
@@ -8,25 +8,29 @@ Author: STScI Demo Project - Phase 3 Implementation
 """
 
 from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, Any, FrozenSet, List, Optional, Tuple
 
 from airflow import DAG
 from airflow.operators.python import PythonOperator
 from airflow.operators.bash import BashOperator
-from airflow.providers.http.operators.http import SimpleHttpOperator
-from airflow.providers.amazon.aws.sensors.s3 import S3KeySensor
 from airflow.operators.dummy import DummyOperator
 from airflow.utils.dates import days_ago
 from airflow.utils.task_group import TaskGroup
-from airflow.models import Variable
+from airflow.models import BaseOperator, Variable, XCom
 from airflow.exceptions import AirflowException
 from airflow.utils.trigger_rule import TriggerRule
+from airflow.utils.session import create_session
+from airflow.plugins.pipeline_common import get_s3_client, json_dumps, json_loads
 
-import boto3
-import json
+import base64
 import logging
-import requests
-from urllib.parse import urljoin
+import pickle
+import time
+from types import MappingProxyType
+
+if TYPE_CHECKING:
+    import requests
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -112,9 +116,98 @@ dag = DAG(
     }
 )
 
-# Configuration
-IMAGE_PROCESSOR_BASE_URL = Variable.get("image_processor_base_url", "http://image-processor-service:8080")
-GRANULAR_API_BASE = f"{IMAGE_PROCESSOR_BASE_URL}/api/v1/processing"
+# Configuration is resolved inside task callables, never at DAG parse time
+
+@lru_cache(maxsize=None)
+def _granular_api_base() -> str:
+    """
+    Base URL of the granular processing API, read from Airflow Variables once
+    per process.
+    """
+    base_url = Variable.get("image_processor_base_url",
+                            "http://image-processor-service:8080")
+    return f"{base_url}/api/v1/processing"
+
+# Supported granular processing steps
+_VALID_STEPS = frozenset({
+    'bias-subtract', 'dark-subtract', 'flat-correct', 'cosmic-ray-remove'
+})
+
+# Map step types to calibration frame requirements
+_CALIBRATION_MAPPING = MappingProxyType({
+    'bias-subtract': 'bias_frame',
+    'dark-subtract': 'dark_frame',
+    'flat-correct': 'flat_frame',
+    'cosmic-ray-remove': None  # No calibration frame needed
+})
+
+# Map step types to algorithm types for API calls
+_ALGORITHM_TYPE_MAPPING = MappingProxyType({
+    'bias-subtract': 'bias-subtraction',
+    'dark-subtract': 'dark-subtraction',
+    'flat-correct': 'flat-correction',
+    'cosmic-ray-remove': 'cosmic-ray-removal'
+})
+
+# Airflow pools capping concurrent step requests against the image processor.
+# Steps defer while their request is in flight, so the pools must count
+# deferred tasks for the cap to hold:
+#   airflow pools set image_processor_cpu 8 "Image processor CPU steps" \
+#       --include-deferred
+#   airflow pools set image_processor_gpu 2 "Image processor GPU steps" \
+#       --include-deferred
+IMAGE_PROCESSOR_CPU_POOL = 'image_processor_cpu'
+IMAGE_PROCESSOR_GPU_POOL = 'image_processor_gpu'
+GPU_STEPS = frozenset({'cosmic-ray-remove'})
+
+@lru_cache(maxsize=None)
+def _s3_transfer_config():
+    """Multipart settings for managed copies of large FITS results."""
+    from boto3.s3.transfer import TransferConfig
+
+    return TransferConfig(
+        multipart_threshold=8 * 1024 * 1024,
+        multipart_chunksize=16 * 1024 * 1024,
+        max_concurrency=16,
+        use_threads=True
+    )
+
+# Algorithm catalog cache, per process and shared across workers through
+# one Airflow Variable per algorithm type ("algo_catalog_cache_<type>")
+ALGORITHM_CACHE_VARIABLE = "algo_catalog_cache"
+ALGORITHM_CACHE_TTL_SECONDS = 300
+_ALGORITHM_CACHE: Dict[str, Tuple[float, FrozenSet[str]]] = {}
+
+# Shared HTTP session, built on first use so DAG parsing never opens one
+_HTTP_SESSION: Optional['requests.Session'] = None
+
+def _http_session() -> 'requests.Session':
+    """Return the process-wide pooled session for image-processor calls."""
+    global _HTTP_SESSION
+    if _HTTP_SESSION is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        session = requests.Session()
+        session.headers.update({'Content-Type': 'application/json'})
+        adapter = HTTPAdapter(
+            pool_connections=50,
+            pool_maxsize=50,
+            max_retries=Retry(
+                total=5,
+                connect=3,
+                read=3,
+                backoff_factor=0.5,
+                status_forcelist=(429, 500, 502, 503, 504),
+                respect_retry_after_header=True,
+                allowed_methods=frozenset(['GET', 'POST'])
+            )
+        )
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        _HTTP_SESSION = session
+    return _HTTP_SESSION
 
 def validate_workflow_config(**context) -> Dict[str, Any]:
     """Validate research workflow configuration and prepare execution context."""
@@ -131,9 +224,8 @@ def validate_workflow_config(**context) -> Dict[str, Any]:
     if not isinstance(steps, list) or len(steps) == 0:
         raise AirflowException("At least one processing step must be specified")
 
-    valid_steps = ['bias-subtract', 'dark-subtract', 'flat-correct', 'cosmic-ray-remove']
     for step_config in steps:
-        if step_config.get('step') not in valid_steps:
+        if step_config.get('step') not in _VALID_STEPS:
             raise AirflowException(f"Invalid processing step: {step_config.get('step')}")
 
     # Prepare workflow context
@@ -149,24 +241,68 @@ def validate_workflow_config(**context) -> Dict[str, Any]:
     logger.info(f"Validated research workflow: {workflow_context['session_id']}")
     return workflow_context
 
-def check_algorithm_availability(algorithm_type: str, algorithm_id: str) -> bool:
-    """Check if specified algorithm is available and supported."""
+def _fetch_algorithms(algorithm_type: str) -> FrozenSet[str]:
+    """
+    Return the ids of supported algorithms for an algorithm type.
+
+    The catalog changes with deployments, not runs, so results are cached in
+    process and shared across workers through an Airflow Variable, both for
+    ALGORITHM_CACHE_TTL_SECONDS. Each type has its own Variable, so workers
+    refreshing different types never overwrite each other's entries. Failed
+    lookups raise and are not cached.
+    """
+    cached = _ALGORITHM_CACHE.get(algorithm_type)
+    if cached and time.time() - cached[0] < ALGORITHM_CACHE_TTL_SECONDS:
+        return cached[1]
+
+    variable_key = f"{ALGORITHM_CACHE_VARIABLE}_{algorithm_type}"
+    entry = Variable.get(variable_key, default_var=None, deserialize_json=True)
+    if entry and time.time() - entry['fetched_at'] < ALGORITHM_CACHE_TTL_SECONDS:
+        supported_ids = frozenset(entry['ids'])
+        _ALGORITHM_CACHE[algorithm_type] = (entry['fetched_at'], supported_ids)
+        return supported_ids
+
+    url = f"{_granular_api_base()}/algorithms/{algorithm_type}"
+    response = _http_session().get(url, timeout=10)
+    response.raise_for_status()
+
+    fetched_at = time.time()
+    supported_ids = frozenset(
+        algo['id'] for algo in json_loads(response.content) if algo.get('supported')
+    )
+    _ALGORITHM_CACHE[algorithm_type] = (fetched_at, supported_ids)
+
     try:
-        url = f"{GRANULAR_API_BASE}/algorithms/{algorithm_type}"
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
+        Variable.set(variable_key,
+                     {'ids': sorted(supported_ids), 'fetched_at': fetched_at},
+                     serialize_json=True)
+    except Exception as e:
+        logger.warning(f"Failed to persist algorithm catalog cache: {e}")
+
+    return supported_ids
 
-        algorithms = response.json()
-        for algo in algorithms:
-            if algo['id'] == algorithm_id and algo['supported']:
-                return True
+def check_algorithm_availability(algorithm_type: str, algorithm_id: str) -> bool:
+    """
+    Check if specified algorithm is available and supported.
 
-        logger.warning(f"Algorithm {algorithm_id} not available for {algorithm_type}")
-        return False
+    Transient failures are retried with backoff by the shared session; once
+    those retries are exhausted the error is raised rather than reported as
+    an unavailable algorithm.
+    """
+    import requests
 
-    except Exception as e:
-        logger.error(f"Failed to check algorithm availability: {e}")
-        return False
+    try:
+        supported_ids = _fetch_algorithms(algorithm_type)
+    except requests.RequestException as e:
+        raise AirflowException(
+            f"Failed to check algorithm availability for {algorithm_type}: {e}"
+        )
+
+    if algorithm_id in supported_ids:
+        return True
+
+    logger.warning(f"Algorithm {algorithm_id} not available for {algorithm_type}")
+    return False
 
 def create_processing_request(step_config: Dict, session_id: str,
                             current_image_path: str, calibration_frames: Dict,
@@ -174,14 +310,6 @@ def create_processing_request(step_config: Dict, session_id: str,
     """Create a granular processing request payload."""
     step_type = step_config['step']
 
-    # Map step types to calibration frame requirements
-    calibration_mapping = {
-        'bias-subtract': 'bias_frame',
-        'dark-subtract': 'dark_frame',
-        'flat-correct': 'flat_frame',
-        'cosmic-ray-remove': None  # No calibration frame needed
-    }
-
     request_payload = {
         'imagePath': current_image_path,
         'sessionId': session_id,
@@ -194,32 +322,28 @@ def create_processing_request(step_config: Dict, session_id: str,
     }
 
     # Add calibration frame if required
-    calibration_key = calibration_mapping.get(step_type)
+    calibration_key = _CALIBRATION_MAPPING.get(step_type)
     if calibration_key and calibration_frames.get(calibration_key):
         request_payload['calibrationPath'] = calibration_frames[calibration_key]
 
     return request_payload
 
-def execute_processing_step(step_config: Dict, **context) -> str:
-    """Execute a single granular processing step."""
+def prepare_processing_step(step_config: Dict, **context) -> Dict[str, Any]:
+    """Build the request payload for a processing step from the workflow context."""
     workflow_context = context['ti'].xcom_pull(task_ids='validate_workflow')
 
-    # Get current image path from previous step or use input
-    current_image_path = context['ti'].xcom_pull(task_ids=f"execute_step_{step_config['step'].replace('-', '_')}")
+    # Input is the previous step's output (its only upstream), pulled in one
+    # query; the first step in the chain falls back to the input image
+    upstream_paths = context['ti'].xcom_pull(
+        task_ids=sorted(context['task'].upstream_task_ids)
+    )
+    current_image_path = next(
+        (path for path in reversed(upstream_paths or []) if path), None
+    )
     if not current_image_path:
-        # Check for previous steps in sequence
-        previous_steps = ['bias_subtract', 'dark_subtract', 'flat_correct']
-        for prev_step in previous_steps:
-            current_image_path = context['ti'].xcom_pull(task_ids=f"execute_step_{prev_step}")
-            if current_image_path:
-                break
-
-        # Fallback to input image
-        if not current_image_path:
-            current_image_path = workflow_context['input_path']
-
-    # Create processing request
-    request_payload = create_processing_request(
+        current_image_path = workflow_context['input_path']
+
+    return create_processing_request(
         step_config,
         workflow_context['session_id'],
         current_image_path,
@@ -227,51 +351,136 @@ def execute_processing_step(step_config: Dict, **context) -> str:
         workflow_context['output_config']
     )
 
-    # Execute processing step
+def complete_processing_step(step_config: Dict, result: Dict[str, Any],
+                             **context) -> str:
+    """Record a finished processing step's metrics and return its output path."""
     step_type = step_config['step']
-    endpoint_url = f"{GRANULAR_API_BASE}/steps/{step_type}"
-
-    logger.info(f"Executing {step_type} with algorithm {step_config.get('algorithm', 'default')}")
+    output_path = result['outputPath']
+
+    logger.info(f"Processing step {step_type} completed: {output_path}")
+
+    # Store processing metrics in S3 and keep only the "<bucket>/<key>" handle
+    # in XCom; without an intermediate bucket they go to XCom directly
+    if result.get('processingMetrics'):
+        workflow_context = context['ti'].xcom_pull(task_ids='validate_workflow')
+        metrics_bucket = workflow_context['output_config'].get('intermediate_bucket')
+        metrics_value = result['processingMetrics']
+
+        if metrics_bucket:
+            metrics_key = f"{workflow_context['session_id']}/{step_type}/metrics.json"
+            get_s3_client().put_object(
+                Bucket=metrics_bucket,
+                Key=metrics_key,
+                Body=json_dumps(metrics_value),
+                ContentType='application/json'
+            )
+            metrics_value = f"{metrics_bucket}/{metrics_key}"
 
-    try:
-        response = requests.post(
-            endpoint_url,
-            json=request_payload,
-            headers={'Content-Type': 'application/json'},
-            timeout=300  # 5 minute timeout for processing
+        context['ti'].xcom_push(
+            key=f"{step_type}_metrics",
+            value=metrics_value
         )
-        response.raise_for_status()
 
-        result = response.json()
-        output_path = result['outputPath']
+    return output_path
 
-        logger.info(f"Processing step {step_type} completed: {output_path}")
+def _load_step_metrics(metrics: Any) -> Dict[str, Any]:
+    """Resolve a step metrics XCom, fetching it from S3 when it is a handle."""
+    if not isinstance(metrics, str):
+        return metrics
 
-        # Store processing metrics
-        if result.get('processingMetrics'):
-            context['ti'].xcom_push(
-                key=f"{step_type}_metrics",
-                value=result['processingMetrics']
+    bucket, key = metrics.split('/', 1)
+    response = get_s3_client().get_object(Bucket=bucket, Key=key)
+    return json_loads(response['Body'].read())
+
+class ProcessingStepOperator(BaseOperator):
+    """
+    Run one granular processing step without holding a worker slot.
+
+    The step request can take minutes, so the POST is handed to the
+    triggerer via HttpTrigger and the task resumes in execute_complete
+    once the image processor responds.
+    """
+
+    def __init__(self, step_config: Dict, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.step_config = step_config
+
+    def execute(self, context: Dict) -> None:
+        step_type = self.step_config['step']
+        request_payload = prepare_processing_step(self.step_config, **context)
+
+        algorithm = self.step_config.get('algorithm', 'default')
+        logger.info(f"Executing {step_type} with algorithm {algorithm}")
+
+        # Imported here so DAG parsing does not load the HTTP provider stack
+        from airflow.providers.http.triggers.http import HttpTrigger
+
+        self.defer(
+            trigger=HttpTrigger(
+                # Full URL comes from the image_processor_base_url Variable,
+                # so no HTTP connection is involved
+                http_conn_id='',
+                method='POST',
+                endpoint=f"{_granular_api_base()}/steps/{step_type}",
+                headers={'Content-Type': 'application/json'},
+                # HttpAsyncHook sends POST data as json=, so pass the dict
+                # itself; a pre-serialized body would be encoded twice
+                data=request_payload
+            ),
+            method_name='execute_complete',
+            timeout=timedelta(seconds=300)  # 5 minute timeout for processing
+        )
+
+    def execute_complete(self, context: Dict, event: Dict[str, Any]) -> str:
+        step_type = self.step_config['step']
+
+        if event['status'] != 'success':
+            logger.error(f"Processing step {step_type} failed: {event.get('message')}")
+            raise AirflowException(
+                f"Failed to execute {step_type}: {event.get('message')}"
             )
 
-        return output_path
+        response = pickle.loads(base64.standard_b64decode(event['response']))
+        return complete_processing_step(
+            self.step_config, json_loads(response.content), **context
+        )
+
+def _step_task_id(step_type: str) -> str:
+    """Full task id of a step's processing task in the processing_steps group."""
+    return f"processing_steps.execute_step_{step_type.replace('-', '_')}"
 
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Processing step {step_type} failed: {e}")
-        raise AirflowException(f"Failed to execute {step_type}: {e}")
+def _step_xcoms(context: Dict, task_ids: List[str]) -> Dict[Tuple[str, str], Any]:
+    """
+    Fetch every XCom pushed by the given tasks in this run, keyed by
+    (task_id, key).
+    """
+    with create_session() as session:
+        rows = XCom.get_many(
+            run_id=context['run_id'],
+            dag_ids=context['dag'].dag_id,
+            task_ids=task_ids,
+            key=None,
+            session=session
+        ).all()
+        return {(row.task_id, row.key): XCom.deserialize_value(row) for row in rows}
 
 def finalize_research_results(**context) -> Dict[str, Any]:
     """Finalize research results and move to final location."""
     workflow_context = context['ti'].xcom_pull(task_ids='validate_workflow')
 
-    # Get final processed image path from last step
-    final_image_path = None
     processing_steps = workflow_context['processing_chain']
 
-    # Find the last executed step
+    # Output paths and metrics for every step, in one query
+    step_xcoms = _step_xcoms(
+        context, [_step_task_id(step['step']) for step in processing_steps]
+    )
+
+    # Get final processed image path from the last executed step
+    final_image_path = None
     for step_config in reversed(processing_steps):
-        step_key = f"execute_step_{step_config['step'].replace('-', '_')}"
-        final_image_path = context['ti'].xcom_pull(task_ids=step_key)
+        final_image_path = step_xcoms.get(
+            (_step_task_id(step_config['step']), 'return_value')
+        )
         if final_image_path:
             break
 
@@ -282,27 +491,29 @@ def finalize_research_results(**context) -> Dict[str, Any]:
     processing_metrics = {}
     for step_config in processing_steps:
         step_type = step_config['step']
-        metrics = context['ti'].xcom_pull(key=f"{step_type}_metrics")
+        metrics = step_xcoms.get((_step_task_id(step_type), f"{step_type}_metrics"))
         if metrics:
-            processing_metrics[step_type] = metrics
+            processing_metrics[step_type] = _load_step_metrics(metrics)
 
     # Move final result to processed bucket if configured
     output_config = workflow_context['output_config']
     final_bucket = output_config.get('final_bucket')
 
     if final_bucket:
-        # Call intermediate storage service to move final result
-        move_request = {
-            'intermediateResultPath': final_image_path,
-            'finalBucket': final_bucket,
-            'finalPath': f"research/{workflow_context['session_id']}/final_result.fits"
-        }
+        # Intermediate results are addressed as "<bucket>/<key>"
+        source_bucket, source_key = final_image_path.split('/', 1)
+        final_key = f"research/{workflow_context['session_id']}/final_result.fits"
 
         try:
-            # This would call the IntermediateStorageService.moveFinalResult method
-            # For now, we'll just log the intent
-            logger.info(f"Would move final result from {final_image_path} to {final_bucket}")
-            final_result_path = f"{final_bucket}/research/{workflow_context['session_id']}/final_result.fits"
+            get_s3_client().copy(
+                {'Bucket': source_bucket, 'Key': source_key},
+                final_bucket,
+                final_key,
+                Config=_s3_transfer_config()
+            )
+            logger.info(f"Moved final result from {final_image_path} to "
+                        f"{final_bucket}/{final_key}")
+            final_result_path = f"{final_bucket}/{final_key}"
         except Exception as e:
             logger.warning(f"Failed to move final result: {e}")
             final_result_path = final_image_path
@@ -354,15 +565,7 @@ def create_algorithm_check_task(step_config: Dict) -> PythonOperator:
         step_type = step_config['step']
         algorithm_id = step_config.get('algorithm', 'default')
 
-        # Map step types to algorithm types for API calls
-        algorithm_type_mapping = {
-            'bias-subtract': 'bias-subtraction',
-            'dark-subtract': 'dark-subtraction',
-            'flat-correct': 'flat-correction',
-            'cosmic-ray-remove': 'cosmic-ray-removal'
-        }
-
-        algorithm_type = algorithm_type_mapping.get(step_type, step_type)
+        algorithm_type = _ALGORITHM_TYPE_MAPPING.get(step_type, step_type)
 
         if not check_algorithm_availability(algorithm_type, algorithm_id):
             raise AirflowException(f"Algorithm {algorithm_id} not available for {step_type}")
@@ -372,19 +575,24 @@ def create_algorithm_check_task(step_config: Dict) -> PythonOperator:
     return PythonOperator(
         task_id=f'check_algorithm_{step_config["step"].replace("-", "_")}',
         python_callable=check_algorithm,
+        retries=0,  # the HTTP session already retries with backoff
         dag=dag
     )
 
 # Processing step tasks
-def create_processing_step_task(step_config: Dict) -> PythonOperator:
+def create_processing_step_task(step_config: Dict) -> ProcessingStepOperator:
     """Create processing step task."""
 
-    def execute_step(**context):
-        return execute_processing_step(step_config, **context)
-
-    return PythonOperator(
+    return ProcessingStepOperator(
         task_id=f'execute_step_{step_config["step"].replace("-", "_")}',
-        python_callable=execute_step,
+        step_config=step_config,
+        pool=(
+            IMAGE_PROCESSOR_GPU_POOL if step_config['step'] in GPU_STEPS
+            else IMAGE_PROCESSOR_CPU_POOL
+        ),
+        pool_slots=1,
+        retry_exponential_backoff=True,
+        max_retry_delay=timedelta(minutes=10),
         dag=dag,
         doc_md=f"""
         ## Execute {step_config['step'].title()} Processing
@@ -393,7 +601,7 @@ def create_processing_step_task(step_config: Dict) -> PythonOperator:
 
         **Parameters:**
         ```json
-        {json.dumps(step_config.get('parameters', {}), indent=2)}
+        {json_dumps(step_config.get('parameters', {}), indent=True).decode('utf-8')}
         ```
         """
     )
@@ -436,25 +644,28 @@ with TaskGroup("processing_steps", dag=dag) as processing_group:
         {'step': 'cosmic-ray-remove', 'algorithm': 'lacosmic'}
     ]
 
-    previous_task = None
-    algorithm_check_tasks = []
+    # Algorithm checks are independent of each other, so they all run
+    # concurrently up front and fan in before any processing starts
+    algorithm_check_tasks = [
+        create_algorithm_check_task(step_config) for step_config in default_steps
+    ]
+
+    checks_complete = DummyOperator(
+        task_id='checks_complete',
+        trigger_rule=TriggerRule.ALL_SUCCESS,
+        dag=dag
+    )
+    algorithm_check_tasks >> checks_complete
+
+    # Processing steps form a linear chain, each consuming the previous output
+    previous_task = checks_complete
     processing_tasks = []
 
     for step_config in default_steps:
-        # Create algorithm check task
-        check_task = create_algorithm_check_task(step_config)
-        algorithm_check_tasks.append(check_task)
-
-        # Create processing step task
         process_task = create_processing_step_task(step_config)
         processing_tasks.append(process_task)
 
-        # Set dependencies
-        check_task >> process_task
-
-        if previous_task:
-            previous_task >> process_task
-
+        previous_task >> process_task
         previous_task = process_task
 
 # Define task dependencies
@@ -14,20 +14,22 @@ from airflow import DAG
 from airflow.operators.python import PythonOperator
 from airflow.operators.dummy import DummyOperator
 from airflow.utils.dates import days_ago
-from airflow.utils.task_group import TaskGroup
+from airflow.models import XCom
+from airflow.models.baseoperator import chain
+from airflow.utils.session import create_session
 from airflow.utils.trigger_rule import TriggerRule
 
 # Import our custom operators
 from airflow.plugins.granular_processing_operators import (
-    BiasSubtractionOperator,
-    DarkSubtractionOperator,
-    FlatFieldCorrectionOperator,
     CosmicRayRemovalOperator,
     AlgorithmDiscoveryOperator,
+    CalibrationPipelineOperator,
     CustomWorkflowOperator,
-    IntermediateResultsOperator
+    IntermediateResultsOperator,
+    load_metrics
 )
 
+import itertools
 import logging
 
 logger = logging.getLogger(__name__)
@@ -44,6 +46,41 @@ COMMON_DAG_ARGS = {
     'execution_timeout': timedelta(hours=2),
 }
 
+# Templates and paths shared by the template DAGs
+SESSION_ID_TEMPLATE = '{{ params.session_id }}'
+MASTER_BIAS_PATH = 'calibration/master_bias.fits'
+MASTER_DARK_PATH = 'calibration/master_dark.fits'
+MASTER_FLAT_PATH = 'calibration/master_flat.fits'
+
+# Algorithms and calibration frames for the quality assessment calibration chain
+QUALITY_PIPELINE_ALGORITHMS = {
+    'bias-subtract': 'default',
+    'dark-subtract': 'scaled-dark',
+    'flat-correct': 'illumination-corrected',
+    'cosmic-ray-remove': 'lacosmic-v2'
+}
+QUALITY_PIPELINE_CALIBRATION = {
+    'bias-subtract': MASTER_BIAS_PATH,
+    'dark-subtract': MASTER_DARK_PATH,
+    'flat-correct': MASTER_FLAT_PATH
+}
+
+def _mapped_xcoms(context: Dict, task_id: str, key: str) -> Dict[int, Any]:
+    """
+    Fetch one XCom key from every instance of a mapped task in a single query.
+
+    Returns a dict keyed by map index; instances that pushed nothing are absent.
+    """
+    with create_session() as session:
+        rows = XCom.get_many(
+            run_id=context['run_id'],
+            dag_ids=context['dag'].dag_id,
+            task_ids=task_id,
+            key=key,
+            session=session
+        ).all()
+        return {row.map_index: XCom.deserialize_value(row) for row in rows}
+
 # =============================================================================
 # Template 1: Algorithm Comparison Workflow
 # =============================================================================
@@ -89,36 +126,43 @@ def create_algorithm_comparison_dag() -> DAG:
         dag=dag
     )
 
-    # Comparison tasks
-    comparison_tasks = []
-    for i, algo_config in enumerate([
-        {"algorithm": "lacosmic", "parameters": {"sigclip": 4.5, "niter": 4}},
-        {"algorithm": "lacosmic-v2", "parameters": {"sigclip": 4.5, "starPreservation": True}},
-        {"algorithm": "median-filter", "parameters": {"kernelSize": 5, "threshold": 5.0}}
-    ]):
-        task = CosmicRayRemovalOperator(
-            task_id=f'test_algorithm_{algo_config["algorithm"]}',
-            image_path='{{ params.input_image }}',
-            session_id='{{ params.session_id }}',
-            algorithm=algo_config['algorithm'],
-            parameters=algo_config['parameters'],
-            output_path=f'comparison/algorithm_{i}/',
-            dag=dag
-        )
-        comparison_tasks.append(task)
+    # One mapped task instance per configured algorithm
+    def select_algorithms(**context):
+        """Expand the configured algorithms into per-instance operator kwargs."""
+        return [
+            {
+                'algorithm': algo_config['algorithm'],
+                'parameters': algo_config.get('parameters', {}),
+                'output_path': f'comparison/algorithm_{i}/'
+            }
+            for i, algo_config in enumerate(context['params']['algorithms_to_compare'])
+        ]
+
+    algorithm_configs = PythonOperator(
+        task_id='select_algorithms',
+        python_callable=select_algorithms,
+        dag=dag
+    )
+
+    comparison_tasks = CosmicRayRemovalOperator.partial(
+        task_id='test_algorithm',
+        image_path='{{ params.input_image }}',
+        session_id=SESSION_ID_TEMPLATE,
+        dag=dag
+    ).expand_kwargs(algorithm_configs.output)
 
     # Results comparison
     def compare_algorithm_results(**context):
         """Compare results from different algorithms."""
+        configs = context['ti'].xcom_pull(task_ids='select_algorithms')
+        output_paths = _mapped_xcoms(context, 'test_algorithm', 'return_value')
+        states = _mapped_xcoms(context, 'test_algorithm', 'test_algorithm_state')
+
         results = {}
-        for i, task in enumerate(comparison_tasks):
-            task_id = task.task_id
-            output_path = context['ti'].xcom_pull(task_ids=task_id)
-            metrics = context['ti'].xcom_pull(key=f"{task_id}_metrics")
-
-            results[task_id] = {
-                'output_path': output_path,
-                'metrics': metrics
+        for i, config in enumerate(configs):
+            results[config['algorithm']] = {
+                'output_path': output_paths.get(i),
+                'metrics': load_metrics(states.get(i, {}).get('metrics'))
             }
 
         logger.info(f"Algorithm comparison results: {results}")
@@ -131,8 +175,7 @@ def create_algorithm_comparison_dag() -> DAG:
     )
 
     # Set dependencies
-    discover_algorithms >> comparison_tasks
-    comparison_tasks >> compare_results
+    chain(discover_algorithms, algorithm_configs, comparison_tasks, compare_results)
 
     return dag
 
@@ -169,16 +212,12 @@ def create_parameter_optimization_dag() -> DAG:
         """Generate all combinations of parameters for grid search."""
         param_grid = context['params']['parameter_grid']
 
-        # Simple grid generation (in practice, use itertools.product)
-        combinations = []
-        for sigclip in param_grid['sigclip']:
-            for niter in param_grid['niter']:
-                for star_pres in param_grid['starPreservation']:
-                    combinations.append({
-                        'sigclip': sigclip,
-                        'niter': niter,
-                        'starPreservation': star_pres
-                    })
+        # Cartesian product over however many axes the grid defines
+        keys = list(param_grid)
+        combinations = [
+            dict(zip(keys, values))
+            for values in itertools.product(*(param_grid[key] for key in keys))
+        ]
 
         logger.info(f"Generated {len(combinations)} parameter combinations")
         return combinations
@@ -189,30 +228,29 @@ def create_parameter_optimization_dag() -> DAG:
         dag=dag
     )
 
-    # Parameter testing tasks (simplified - in practice, use dynamic task generation)
-    param_test_tasks = []
-    for i in range(4):  # Test first 4 combinations as example
-        task = CosmicRayRemovalOperator(
-            task_id=f'test_params_{i}',
-            image_path='{{ params.input_image }}',
-            session_id='{{ params.session_id }}',
-            algorithm='{{ params.algorithm }}',
-            parameters={'sigclip': 4.5, 'niter': 4, 'starPreservation': True},  # Simplified
-            output_path=f'optimization/test_{i}/',
-            dag=dag
-        )
-        param_test_tasks.append(task)
+    # One mapped task instance per parameter combination
+    param_test_tasks = CosmicRayRemovalOperator.partial(
+        task_id='test_params',
+        image_path='{{ params.input_image }}',
+        session_id=SESSION_ID_TEMPLATE,
+        algorithm='{{ params.algorithm }}',
+        output_path='optimization/test_{{ ti.map_index }}/',
+        dag=dag
+    ).expand(parameters=generate_params.output)
 
     # Optimization analysis
     def analyze_optimization_results(**context):
         """Analyze parameter optimization results."""
+        combinations = context['ti'].xcom_pull(
+            task_ids='generate_parameter_combinations'
+        )
+        states = _mapped_xcoms(context, 'test_params', 'test_params_state')
+
         best_result = None
         best_score = float('-inf')
 
-        for task in param_test_tasks:
-            task_id = task.task_id
-            metrics = context['ti'].xcom_pull(key=f"{task_id}_metrics")
-
+        for map_index, state in sorted(states.items()):
+            metrics = load_metrics(state.get('metrics'))
             if metrics:
                 # Simple scoring based on processing time and cosmic rays removed
                 score = metrics.get('cosmicRaysRemoved', 0) / metrics.get('processingTimeMs', 1)
@@ -220,7 +258,8 @@ def create_parameter_optimization_dag() -> DAG:
                 if score > best_score:
                     best_score = score
                     best_result = {
-                        'task_id': task_id,
+                        'map_index': map_index,
+                        'parameters': combinations[map_index],
                         'metrics': metrics,
                         'score': score
                     }
@@ -271,70 +310,42 @@ def create_quality_assessment_dag() -> DAG:
         }
     )
 
-    # Process multiple images through the same pipeline
-    processing_tasks = []
-    for i, image_path in enumerate(["star_field.fits", "galaxy_cluster.fits", "nebula_region.fits"]):
-        with TaskGroup(f"process_image_{i}", dag=dag) as image_group:
-
-            # Bias subtraction
-            bias_subtract = BiasSubtractionOperator(
-                task_id='bias_subtract',
-                image_path=f"test-data/{image_path}",
-                session_id='{{ params.session_id }}',
-                calibration_path='calibration/master_bias.fits',
-                output_path=f'quality_test/image_{i}/bias/'
-            )
-
-            # Dark subtraction
-            dark_subtract = DarkSubtractionOperator(
-                task_id='dark_subtract',
-                image_path='{{ ti.xcom_pull(task_ids="process_image_' + str(i) + '.bias_subtract") }}',
-                session_id='{{ params.session_id }}',
-                calibration_path='calibration/master_dark.fits',
-                algorithm='scaled-dark',
-                output_path=f'quality_test/image_{i}/dark/'
-            )
-
-            # Flat correction
-            flat_correct = FlatFieldCorrectionOperator(
-                task_id='flat_correct',
-                image_path='{{ ti.xcom_pull(task_ids="process_image_' + str(i) + '.dark_subtract") }}',
-                session_id='{{ params.session_id }}',
-                calibration_path='calibration/master_flat.fits',
-                algorithm='illumination-corrected',
-                output_path=f'quality_test/image_{i}/flat/'
-            )
-
-            # Cosmic ray removal
-            cosmic_ray_remove = CosmicRayRemovalOperator(
-                task_id='cosmic_ray_remove',
-                image_path='{{ ti.xcom_pull(task_ids="process_image_' + str(i) + '.flat_correct") }}',
-                session_id='{{ params.session_id }}',
-                algorithm='lacosmic-v2',
-                output_path=f'quality_test/image_{i}/cosmic/'
-            )
-
-            # Set processing order
-            bias_subtract >> dark_subtract >> flat_correct >> cosmic_ray_remove
-
-        processing_tasks.append(image_group)
+    # Input images come from params, so the image list can change per run
+    def list_input_images(**context) -> List[str]:
+        """Return the images to push through the pipeline."""
+        return list(context['params']['input_images'])
+
+    input_images = PythonOperator(
+        task_id='list_input_images',
+        python_callable=list_input_images,
+        dag=dag
+    )
+
+    # One calibration task per image runs the whole chain through the image
+    # processor's custom workflow endpoint, so the steps are fused server-side
+    calibrate = CalibrationPipelineOperator.partial(
+        task_id='calibrate',
+        session_id=SESSION_ID_TEMPLATE,
+        algorithms=QUALITY_PIPELINE_ALGORITHMS,
+        calibration_paths=QUALITY_PIPELINE_CALIBRATION,
+        dag=dag
+    ).expand(input_image_path=input_images.output)
 
     # Quality assessment
     def assess_processing_quality(**context):
         """Assess the quality of processing across multiple images."""
         quality_metrics = {}
 
-        for i in range(3):  # 3 test images
-            image_metrics = {}
-
-            # Collect metrics from each processing step
-            for step in ['bias_subtract', 'dark_subtract', 'flat_correct', 'cosmic_ray_remove']:
-                task_id = f'process_image_{i}.{step}'
-                metrics = context['ti'].xcom_pull(key=f"{task_id}_metrics")
-                if metrics:
-                    image_metrics[step] = metrics
-
-            quality_metrics[f'image_{i}'] = image_metrics
+        # Per-step metrics for every image, from one query
+        results = _mapped_xcoms(context, 'calibrate', 'return_value')
+        for map_index, result in sorted(results.items()):
+            image_metrics = {
+                step['stepType']: step['metrics']
+                for step in (result or {}).get('stepResults', [])
+                if step.get('metrics')
+            }
+            if image_metrics:
+                quality_metrics[f'image_{map_index}'] = image_metrics
 
         # Compute overall quality scores
         overall_assessment = {
@@ -355,7 +366,7 @@ def create_quality_assessment_dag() -> DAG:
     )
 
     # Set dependencies
-    processing_tasks >> quality_assessment
+    calibrate >> quality_assessment
 
     return dag
 
@@ -433,7 +444,7 @@ def create_custom_research_dag() -> DAG:
     execute_workflow = CustomWorkflowOperator(
         task_id='execute_custom_workflow',
         input_image_path='{{ params.input_dataset }}/sample_image.fits',
-        session_id='{{ params.session_id }}',
+        session_id=SESSION_ID_TEMPLATE,
         workflow_steps='{{ params.custom_workflow_steps }}',
         output_configuration={
             'project_name': '{{ params.research_project }}',
@@ -473,7 +484,7 @@ def create_custom_research_dag() -> DAG:
     # Cleanup intermediate files
     cleanup_intermediate = IntermediateResultsOperator(
         task_id='cleanup_intermediate_files',
-        session_id='{{ params.session_id }}',
+        session_id=SESSION_ID_TEMPLATE,
         operation='cleanup',
         keep_final_result=True,
         dag=dag
@@ -8,25 +8,42 @@ Author: STScI Demo Project
 """
 
 from datetime import datetime, timedelta
-from typing import Dict, Any
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 
 from airflow import DAG
-from airflow.operators.python import PythonOperator
-from airflow.operators.bash import BashOperator
+from airflow.operators.python import PythonOperator, ShortCircuitOperator
 from airflow.providers.postgres.operators.postgres import PostgresOperator
+from airflow.providers.postgres.hooks.postgres import PostgresHook
 from airflow.providers.http.operators.http import SimpleHttpOperator
 from airflow.providers.amazon.aws.operators.s3 import S3CreateObjectOperator, S3DeleteObjectOperator
 from airflow.providers.amazon.aws.sensors.s3 import S3KeySensor
 from airflow.providers.kubernetes.operators.kubernetes_pod import KubernetesPodOperator
-from airflow.operators.email import EmailOperator
+from airflow.sensors.base import BaseSensorOperator
 from airflow.utils.dates import days_ago
+from airflow.utils.email import send_email
 from airflow.utils.task_group import TaskGroup
 from airflow.models import Variable
-from airflow.exceptions import AirflowException
+from airflow.exceptions import AirflowException, AirflowFailException
+from airflow.plugins.pipeline_common import get_s3_client, json_dumps, json_loads
+from airflow.plugins.processing_job_triggers import ProcessingJobStatusTrigger
 
 import boto3
-import json
+import gzip
 import logging
+import os
+import requests
+import time
+from contextlib import closing
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from psycopg2.extras import execute_values
+
+try:
+    import ijson
+except ImportError:  # ijson is optional; job results are then decoded in one go
+    ijson = None
 
 # Default arguments for all tasks
 default_args = {
@@ -40,6 +57,21 @@ default_args = {
     'execution_timeout': timedelta(hours=2),
 }
 
+def notify_pipeline_failure(context: Dict[str, Any]) -> None:
+    """DAG failure callback: email the pipeline alerts list once per failed run."""
+    send_email(
+        to=['astro-pipeline-alerts@example.com'],
+        subject='Airflow Alert: Telescope Data Processing Failed',
+        html_content=f"""
+    <h3>Telescope Data Processing Pipeline Failed</h3>
+    <p>The telescope data processing pipeline has encountered a failure.</p>
+    <p><strong>DAG:</strong> {context['dag'].dag_id}</p>
+    <p><strong>Execution Date:</strong> {context['ds']}</p>
+    <p><strong>Failed Task:</strong> {context['task_instance'].task_id}</p>
+    <p>Please check the Airflow logs for more details.</p>
+    """
+    )
+
 # DAG definition
 dag = DAG(
     'telescope_data_processing',
@@ -49,99 +81,422 @@ dag = DAG(
     catchup=False,
     max_active_runs=3,
     tags=['astronomy', 'image-processing', 'production'],
+    on_failure_callback=notify_pipeline_failure,
 )
 
 # Configuration variables
-S3_BUCKET_RAW = Variable.get("s3_bucket_raw", "astro-data-pipeline-raw-data-dev")
-S3_BUCKET_PROCESSED = Variable.get("s3_bucket_processed", "astro-data-pipeline-processed-data-dev") 
-S3_BUCKET_ARCHIVE = Variable.get("s3_bucket_archive", "astro-data-pipeline-archive-dev")
-IMAGE_PROCESSOR_URL = Variable.get("image_processor_url", "http://image-processor-service:8080")
-CATALOG_SERVICE_URL = Variable.get("catalog_service_url", "http://catalog-service:8080")
-PROCESSING_NAMESPACE = Variable.get("k8s_namespace", "astro-pipeline")
-
-def discover_new_fits_files(**context) -> list:
+PIPELINE_CONFIG_DEFAULTS = {
+    's3_bucket_raw': 'astro-data-pipeline-raw-data-dev',
+    's3_bucket_processed': 'astro-data-pipeline-processed-data-dev',
+    's3_bucket_archive': 'astro-data-pipeline-archive-dev',
+    'image_processor_url': 'http://image-processor-service:8080',
+    'catalog_service_url': 'http://catalog-service:8080',
+    'k8s_namespace': 'astro-pipeline',
+    'fits_arrival_queue_url': '',
+}
+
+def _load_pipeline_config() -> Dict[str, str]:
     """
-    Discover new FITS files in S3 that need processing.
+    Read the pipeline settings from the JSON Variable astro_pipeline_config.
+    
+    One metadata DB query per parse when that Variable exists; otherwise each
+    setting falls back to its own legacy Variable.
     """
-    logging.info("Discovering new FITS files for processing")
+    config = Variable.get("astro_pipeline_config", default_var=None,
+                          deserialize_json=True)
+    if config is None:
+        return {
+            name: Variable.get(name, default)
+            for name, default in PIPELINE_CONFIG_DEFAULTS.items()
+        }
+    return {**PIPELINE_CONFIG_DEFAULTS, **config}
+
+_PIPELINE_CONFIG = _load_pipeline_config()
+S3_BUCKET_RAW = _PIPELINE_CONFIG['s3_bucket_raw']
+S3_BUCKET_PROCESSED = _PIPELINE_CONFIG['s3_bucket_processed']
+S3_BUCKET_ARCHIVE = _PIPELINE_CONFIG['s3_bucket_archive']
+IMAGE_PROCESSOR_URL = _PIPELINE_CONFIG['image_processor_url']
+CATALOG_SERVICE_URL = _PIPELINE_CONFIG['catalog_service_url']
+PROCESSING_NAMESPACE = _PIPELINE_CONFIG['k8s_namespace']
+# Empty: discover by listing the raw bucket
+FITS_ARRIVAL_QUEUE_URL = _PIPELINE_CONFIG['fits_arrival_queue_url']
+JSON_HEADERS = {'Content-Type': 'application/json'}
+HTTP_WORKERS = 32  # Concurrent requests per task against the processing services
+CATALOG_BATCH_SIZE = 5000  # Detected objects per catalog batch request
+TEMP_DIR = '/tmp'  # Scratch space swept by cleanup_temp_files
+HEADER_CHECK_WORKERS = 16  # Concurrent ranged header reads during validation
+# Arrival messages drained per run; the rest wait for the next run
+MAX_ARRIVALS_PER_RUN = 10000
+
+# Header validation outcomes are kept this long in fits_validation_cache
+VALIDATION_CACHE_RETENTION = '2 days'
+
+# Accepted raw image sizes
+MIN_FITS_BYTES = 1024 * 1024  # 1MB
+MAX_FITS_BYTES = 500 * 1024 * 1024  # 500MB
+
+# FITS layout: headers are 2880-byte blocks of 80-character cards
+FITS_BLOCK_SIZE = 2880
+FITS_CARD_SIZE = 80
+VALID_BITPIX = frozenset({'8', '16', '32', '64', '-32', '-64'})
+
+# Pooled HTTP session shared by every task callable in this DAG
+HTTP_SESSION = requests.Session()
+_http_adapter = HTTPAdapter(
+    pool_connections=32,
+    pool_maxsize=64,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504])
+)
+HTTP_SESSION.mount('http://', _http_adapter)
+HTTP_SESSION.mount('https://', _http_adapter)
+
+def _manifest_key(context, name: str) -> str:
+    """S3 key for a per-run manifest in the processed data bucket."""
+    run_id = context['dag_run'].run_id
+    return f"manifests/telescope_data_processing/{run_id}/{name}.json.gz"
+
+def _write_manifest(key: str, payload: Any) -> None:
+    """
+    Store a gzipped JSON manifest in S3.
     
-    s3_client = boto3.client('s3')
+    File lists are exchanged between tasks through S3 so that XCom only
+    carries the manifest key and summary counts.
+    """
+    get_s3_client().put_object(
+        Bucket=S3_BUCKET_PROCESSED,
+        Key=key,
+        Body=gzip.compress(json_dumps(payload)),
+        ContentType='application/json',
+        ContentEncoding='gzip'
+    )
+
+def _read_manifest(key: str) -> Any:
+    """Load a gzipped JSON manifest written by _write_manifest."""
+    response = get_s3_client().get_object(Bucket=S3_BUCKET_PROCESSED, Key=key)
+    return json_loads(gzip.decompress(response['Body'].read()))
+
+def _day_prefixes(start: datetime, end: datetime) -> List[str]:
+    """Per-day raw data prefixes (fits/YYYY/MM/DD/) covering start..end."""
+    day = start.date()
+    prefixes = []
+    while day <= end.date():
+        prefixes.append(f"fits/{day.strftime('%Y/%m/%d')}/")
+        day += timedelta(days=1)
+    return prefixes
+
+def _list_recent_fits_files(context) -> List[Dict[str, Any]]:
+    """List raw FITS files modified in the hour before the execution date."""
+    s3_client = get_s3_client()
     execution_date = context['execution_date']
     
     # Look for files uploaded in the last hour
     since_time = execution_date - timedelta(hours=1)
     
-    try:
-        response = s3_client.list_objects_v2(
+    # Keys are partitioned as fits/YYYY/MM/DD/, so only the day partitions
+    # overlapping the window are listed; pages are consumed lazily
+    paginator = s3_client.get_paginator('list_objects_v2')
+    pages = (
+        page
+        for prefix in _day_prefixes(since_time, context['data_interval_end'])
+        for page in paginator.paginate(
             Bucket=S3_BUCKET_RAW,
-            Prefix='fits/',
-            StartAfter=f"fits/{since_time.strftime('%Y/%m/%d')}"
+            Prefix=prefix,
+            PaginationConfig={'PageSize': 1000}
+        )
+    )
+    
+    return [
+        {
+            'bucket': S3_BUCKET_RAW,
+            'key': obj['Key'],
+            'size': obj['Size'],
+            'last_modified': obj['LastModified'].isoformat()
+        }
+        for page in pages
+        for obj in page.get('Contents', [])
+        if obj['Key'].endswith('.fits') and obj['LastModified'] >= since_time
+    ]
+
+def _receive_fits_arrivals(sqs_client) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    Drain S3 Object Created events from the FITS arrival queue.
+    
+    Returns the arrived files, de-duplicated by key, and the receipt handles
+    to delete once the files are recorded. Messages that cannot be parsed are
+    left on the queue for its dead letter redrive.
+    """
+    arrivals: Dict[str, Dict[str, Any]] = {}
+    receipt_handles = []
+    
+    while len(receipt_handles) < MAX_ARRIVALS_PER_RUN:
+        response = sqs_client.receive_message(
+            QueueUrl=FITS_ARRIVAL_QUEUE_URL,
+            MaxNumberOfMessages=10,
+            WaitTimeSeconds=20
         )
+        messages = response.get('Messages', [])
+        if not messages:
+            break
         
-        fits_files = []
-        if 'Contents' in response:
-            for obj in response['Contents']:
-                if obj['Key'].endswith('.fits') and obj['LastModified'] >= since_time:
-                    fits_files.append({
-                        'bucket': S3_BUCKET_RAW,
-                        'key': obj['Key'],
-                        'size': obj['Size'],
-                        'last_modified': obj['LastModified'].isoformat()
-                    })
+        for message in messages:
+            try:
+                event = json_loads(message['Body'])
+                detail = event['detail']
+                event_time = datetime.fromisoformat(
+                    event['time'].replace('Z', '+00:00')
+                )
+                file_info = {
+                    'bucket': detail['bucket']['name'],
+                    'key': detail['object']['key'],
+                    'size': detail['object']['size'],
+                    'last_modified': event_time.isoformat()
+                }
+            except (KeyError, TypeError, ValueError) as e:
+                logging.warning(f"Skipping unreadable arrival message "
+                                f"{message.get('MessageId')}: {e}")
+                continue
+            
+            receipt_handles.append(message['ReceiptHandle'])
+            if file_info['key'].endswith('.fits'):
+                # Re-uploads of a key keep only the latest version
+                arrivals[file_info['key']] = file_info
+    
+    return list(arrivals.values()), receipt_handles
+
+def _delete_arrival_messages(sqs_client, receipt_handles: List[str]) -> None:
+    """Remove processed arrival messages from the queue, ten per request."""
+    for start in range(0, len(receipt_handles), 10):
+        batch = receipt_handles[start:start + 10]
+        response = sqs_client.delete_message_batch(
+            QueueUrl=FITS_ARRIVAL_QUEUE_URL,
+            Entries=[
+                {'Id': str(i), 'ReceiptHandle': handle}
+                for i, handle in enumerate(batch)
+            ]
+        )
+        if response.get('Failed'):
+            logging.warning(f"Failed to delete {len(response['Failed'])} arrival "
+                            f"messages; they will be redelivered")
+
+def discover_new_fits_files(**context) -> dict:
+    """
+    Discover new FITS files in S3 that need processing.
+    
+    When an arrival queue is configured the new keys come from S3 event
+    notifications; otherwise the raw bucket is listed for the last hour.
+    """
+    logging.info("Discovering new FITS files for processing")
+    
+    try:
+        if FITS_ARRIVAL_QUEUE_URL:
+            sqs_client = boto3.client('sqs')
+            fits_files, receipt_handles = _receive_fits_arrivals(sqs_client)
+        else:
+            fits_files, receipt_handles = _list_recent_fits_files(context), []
         
         logging.info(f"Found {len(fits_files)} new FITS files to process")
         
         # Store file list for downstream tasks
-        context['task_instance'].xcom_push(key='fits_files', value=fits_files)
+        manifest_key = _manifest_key(context, 'discovered')
+        _write_manifest(manifest_key, fits_files)
+        context['task_instance'].xcom_push(key='fits_files_uri', value=manifest_key)
+        
+        # Arrivals are only acknowledged once they are recorded in the manifest
+        if receipt_handles:
+            _delete_arrival_messages(sqs_client, receipt_handles)
         
-        return fits_files
+        return {'manifest_key': manifest_key, 'file_count': len(fits_files)}
         
     except Exception as e:
         logging.error(f"Error discovering FITS files: {e}")
         raise AirflowException(f"Failed to discover new FITS files: {e}")
 
+def _basic_file_problem(file_info: Dict[str, Any]) -> Optional[str]:
+    """
+    Size and extension checks from listing metadata; returns the rejection
+    reason or None.
+    """
+    try:
+        # Check file size (should be reasonable for astronomical images)
+        file_size = file_info['size']
+        if file_size < MIN_FITS_BYTES:
+            return 'File too small'
+        if file_size > MAX_FITS_BYTES:
+            return 'File too large'
+        
+        # Check file extension
+        if not file_info['key'].lower().endswith('.fits'):
+            return 'Invalid file extension'
+        
+        return None
+        
+    except Exception as e:
+        logging.warning(f"Error validating file {file_info['key']}: {e}")
+        return f'Validation error: {e}'
+
+def _fits_header_problem(file_info: Dict[str, Any]) -> Optional[str]:
+    """
+    Check the mandatory primary header keywords of a FITS file in S3.
+    
+    The FITS standard requires SIMPLE, BITPIX and NAXIS as the first three
+    80-character cards, so a ranged GET of the first 2880-byte block is
+    enough. Returns the rejection reason, or None if the header is valid.
+    """
+    try:
+        response = get_s3_client().get_object(
+            Bucket=file_info['bucket'],
+            Key=file_info['key'],
+            Range=f"bytes=0-{FITS_BLOCK_SIZE - 1}"
+        )
+        block = response['Body'].read()
+        
+        if len(block) < FITS_BLOCK_SIZE:
+            return 'Truncated FITS header'
+        
+        cards = [
+            block[i:i + FITS_CARD_SIZE].decode('ascii')
+            for i in range(0, 3 * FITS_CARD_SIZE, FITS_CARD_SIZE)
+        ]
+        for keyword, card in zip(('SIMPLE', 'BITPIX', 'NAXIS'), cards):
+            if card[:8].rstrip() != keyword or card[8:10] != '= ':
+                return f'Missing {keyword} keyword'
+        
+        values = [card[10:].split('/', 1)[0].strip() for card in cards]
+        if values[0] != 'T':
+            return 'Not a standard FITS file (SIMPLE != T)'
+        if values[1] not in VALID_BITPIX:
+            return f'Invalid BITPIX: {values[1]}'
+        if not values[2].isdigit() or int(values[2]) > 999:
+            return f'Invalid NAXIS: {values[2]}'
+        
+        return None
+        
+    except UnicodeDecodeError:
+        return 'FITS header is not ASCII'
+    except Exception as e:
+        logging.warning(f"Error reading FITS header for {file_info['key']}: {e}")
+        return f'Header validation error: {e}'
+
+def _file_version(file_info: Dict[str, Any]) -> Tuple[str, str, str]:
+    """Cache key for one version of an S3 object."""
+    return file_info['bucket'], file_info['key'], file_info['last_modified']
+
+def _cached_header_problems(
+    files: List[Dict[str, Any]]
+) -> Dict[Tuple[str, str, str], Optional[str]]:
+    """
+    Look up cached header validation outcomes for these file versions.
+    
+    The cache is an optimisation only: if it cannot be read, every file is
+    treated as unchecked.
+    """
+    if not files:
+        return {}
+    
+    buckets, keys, modified = zip(*(_file_version(f) for f in files))
+    try:
+        rows = PostgresHook(postgres_conn_id='astro_processing_db').get_records(
+            """
+            SELECT c.bucket, c.object_key, f.last_modified, c.reason
+            FROM unnest(%s::text[], %s::text[], %s::text[])
+                AS f(bucket, object_key, last_modified)
+            JOIN fits_validation_cache c
+              ON c.bucket = f.bucket
+             AND c.object_key = f.object_key
+             AND c.last_modified = f.last_modified::timestamptz
+            """,
+            parameters=(list(buckets), list(keys), list(modified))
+        )
+    except Exception as e:
+        logging.warning(f"FITS validation cache unavailable: {e}")
+        return {}
+    
+    return {
+        (bucket, key, last_modified): reason
+        for bucket, key, last_modified, reason in rows
+    }
+
+def _cache_header_problems(outcomes: Dict[Tuple[str, str, str], Optional[str]]) -> None:
+    """
+    Record header validation outcomes, skipping transient read errors, and
+    expire old entries.
+    """
+    rows = [
+        (bucket, key, last_modified, reason)
+        for (bucket, key, last_modified), reason in outcomes.items()
+        if not (reason or '').startswith('Header validation error')
+    ]
+    if not rows:
+        return
+    
+    try:
+        hook = PostgresHook(postgres_conn_id='astro_processing_db')
+        with closing(hook.get_conn()) as conn, conn, conn.cursor() as cursor:
+            execute_values(
+                cursor,
+                """
+                INSERT INTO fits_validation_cache
+                    (bucket, object_key, last_modified, reason)
+                VALUES %s
+                ON CONFLICT (bucket, object_key, last_modified)
+                DO UPDATE SET reason = EXCLUDED.reason,
+                              checked_at = CURRENT_TIMESTAMP
+                """,
+                rows
+            )
+            cursor.execute(
+                "DELETE FROM fits_validation_cache "
+                "WHERE checked_at < NOW() - INTERVAL %s",
+                (VALIDATION_CACHE_RETENTION,)
+            )
+    except Exception as e:
+        logging.warning(f"Failed to update FITS validation cache: {e}")
+
 def validate_fits_files(**context) -> dict:
     """
     Validate FITS files before processing to ensure they meet quality standards.
     """
-    fits_files = context['task_instance'].xcom_pull(key='fits_files')
-    
-    if not fits_files:
-        logging.info("No FITS files to validate")
-        return {'valid_files': [], 'invalid_files': []}
+    fits_files = _read_manifest(
+        context['task_instance'].xcom_pull(key='fits_files_uri')
+    )
     
     logging.info(f"Validating {len(fits_files)} FITS files")
     
-    valid_files = []
+    # Cheap metadata checks first, in one pass; only survivors get a header read
+    candidate_files = []
     invalid_files = []
     
     for file_info in fits_files:
-        try:
-            # Basic validation checks
-            file_size = file_info['size']
-            file_key = file_info['key']
-            
-            # Check file size (should be reasonable for astronomical images)
-            if file_size < 1024 * 1024:  # Less than 1MB
-                invalid_files.append({**file_info, 'reason': 'File too small'})
-                continue
-                
-            if file_size > 500 * 1024 * 1024:  # Greater than 500MB
-                invalid_files.append({**file_info, 'reason': 'File too large'})
-                continue
-            
-            # Check file extension
-            if not file_key.lower().endswith('.fits'):
-                invalid_files.append({**file_info, 'reason': 'Invalid file extension'})
-                continue
-                
-            # TODO: Add FITS header validation using astropy
-            # For now, accept all files that pass basic checks
+        reason = _basic_file_problem(file_info)
+        if reason:
+            invalid_files.append({**file_info, 'reason': reason})
+        else:
+            candidate_files.append(file_info)
+    
+    # Header outcomes already recorded by an overlapping run are reused
+    cached = _cached_header_problems(candidate_files)
+    unchecked_files = [f for f in candidate_files if _file_version(f) not in cached]
+    
+    # Header checks read one FITS block per file, so run them side by side
+    checked = {}
+    if unchecked_files:
+        workers = min(HEADER_CHECK_WORKERS, len(unchecked_files))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            reasons = executor.map(_fits_header_problem, unchecked_files)
+            for file_info, reason in zip(unchecked_files, reasons):
+                checked[_file_version(file_info)] = reason
+        _cache_header_problems(checked)
+    
+    logging.info(f"Header checks: {len(cached)} cached, {len(checked)} read from S3")
+    
+    valid_files = []
+    for file_info in candidate_files:
+        version = _file_version(file_info)
+        reason = cached[version] if version in cached else checked[version]
+        if reason:
+            invalid_files.append({**file_info, 'reason': reason})
+        else:
             valid_files.append(file_info)
-            
-        except Exception as e:
-            logging.warning(f"Error validating file {file_info['key']}: {e}")
-            invalid_files.append({**file_info, 'reason': f'Validation error: {e}'})
     
     result = {
         'valid_files': valid_files,
@@ -151,15 +506,59 @@ def validate_fits_files(**context) -> dict:
     logging.info(f"Validation complete: {len(valid_files)} valid, {len(invalid_files)} invalid")
     
     # Store results for downstream tasks
-    context['task_instance'].xcom_push(key='validation_result', value=result)
+    manifest_key = _manifest_key(context, 'validation_result')
+    _write_manifest(manifest_key, result)
+    context['task_instance'].xcom_push(key='validation_result_uri', value=manifest_key)
+    
+    return {
+        'manifest_key': manifest_key,
+        'valid_files': len(valid_files),
+        'invalid_files': len(invalid_files)
+    }
+
+def _submit_job(file_info: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Submit one FITS file for processing; returns the submitted job or None."""
+    try:
+        job_request = {
+            'inputBucket': file_info['bucket'],
+            'inputObjectKey': file_info['key'],
+            'outputBucket': S3_BUCKET_PROCESSED,
+            'processingType': 'FULL_CALIBRATION',
+            'priority': 5
+        }
+        
+        response = HTTP_SESSION.post(
+            f"{IMAGE_PROCESSOR_URL}/api/v1/processing/jobs/s3",
+            data=json_dumps(job_request),
+            headers=JSON_HEADERS,
+            timeout=30
+        )
+        
+        if response.status_code == 202:
+            job_data = json_loads(response.content)
+            logging.info(f"Submitted job {job_data['jobId']} "
+                         f"for file {file_info['key']}")
+            return {
+                'job_id': job_data['jobId'],
+                'file_info': file_info,
+                'status': 'SUBMITTED'
+            }
+        
+        logging.error(f"Failed to submit job for {file_info['key']}: "
+                      f"{response.status_code}")
+        
+    except Exception as e:
+        logging.error(f"Error submitting job for {file_info['key']}: {e}")
     
-    return result
+    return None
 
 def submit_processing_jobs(**context) -> list:
     """
     Submit processing jobs to the image processor service for valid FITS files.
     """
-    validation_result = context['task_instance'].xcom_pull(key='validation_result')
+    validation_result = _read_manifest(
+        context['task_instance'].xcom_pull(key='validation_result_uri')
+    )
     valid_files = validation_result.get('valid_files', [])
     
     if not valid_files:
@@ -168,232 +567,292 @@ def submit_processing_jobs(**context) -> list:
     
     logging.info(f"Submitting {len(valid_files)} files for processing")
     
-    import requests
-    
-    submitted_jobs = []
-    
-    for file_info in valid_files:
-        try:
-            job_request = {
-                'inputBucket': file_info['bucket'],
-                'inputObjectKey': file_info['key'],
-                'outputBucket': S3_BUCKET_PROCESSED,
-                'processingType': 'FULL_CALIBRATION',
-                'priority': 5
-            }
-            
-            response = requests.post(
-                f"{IMAGE_PROCESSOR_URL}/api/v1/processing/jobs/s3",
-                json=job_request,
-                timeout=30
-            )
-            
-            if response.status_code == 202:
-                job_data = response.json()
-                submitted_jobs.append({
-                    'job_id': job_data['jobId'],
-                    'file_info': file_info,
-                    'status': 'SUBMITTED'
-                })
-                logging.info(f"Submitted job {job_data['jobId']} for file {file_info['key']}")
-            else:
-                logging.error(f"Failed to submit job for {file_info['key']}: {response.status_code}")
-                
-        except Exception as e:
-            logging.error(f"Error submitting job for {file_info['key']}: {e}")
+    workers = min(HTTP_WORKERS, len(valid_files))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        submitted_jobs = [job for job in executor.map(_submit_job, valid_files) if job]
     
     # Store job information for monitoring
     context['task_instance'].xcom_push(key='submitted_jobs', value=submitted_jobs)
     
     return submitted_jobs
 
-def monitor_processing_jobs(**context) -> dict:
+class ProcessingServiceDegradedError(AirflowFailException):
+    """Too many processing jobs failed; the image processor is likely unhealthy."""
+
+    def __init__(self, failed_count: int, total_count: int):
+        super().__init__(
+            f"{failed_count}/{total_count} processing jobs FAILED - aborting"
+        )
+        self.failed_count = failed_count
+        self.total_count = total_count
+
+class ProcessingJobsSensor(BaseSensorOperator):
     """
-    Monitor the status of submitted processing jobs.
+    Wait for submitted processing jobs to finish without holding a worker slot.
+
+    Polling runs on the triggerer through ProcessingJobStatusTrigger, which
+    checks every unfinished job concurrently each interval. Jobs still
+    running after max_wait are reported as running rather than failing
+    the task. Once more than max_failed_fraction of the jobs have failed,
+    the task fails straight away with ProcessingServiceDegradedError.
     """
-    submitted_jobs = context['task_instance'].xcom_pull(key='submitted_jobs')
-    
-    if not submitted_jobs:
-        logging.info("No jobs to monitor")
-        return {'completed': [], 'failed': [], 'running': []}
-    
-    logging.info(f"Monitoring {len(submitted_jobs)} processing jobs")
-    
-    import requests
-    import time
-    
-    completed_jobs = []
-    failed_jobs = []
-    running_jobs = []
+
+    def __init__(self, poll_interval: float = 30, max_poll_interval: float = 120,
+                 max_wait: timedelta = timedelta(hours=1),
+                 max_failed_fraction: float = 0.5, **kwargs):
+        super().__init__(**kwargs)
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.max_wait = max_wait
+        self.max_failed_fraction = max_failed_fraction
+
+    def execute(self, context: Dict[str, Any]) -> Optional[dict]:
+        submitted_jobs = context['task_instance'].xcom_pull(key='submitted_jobs')
+
+        if not submitted_jobs:
+            logging.info("No jobs to monitor")
+            return self._publish(context, {
+                'completed': [], 'failed': [], 'running': []
+            })
+
+        logging.info(f"Monitoring {len(submitted_jobs)} processing jobs")
+
+        self.defer(
+            trigger=ProcessingJobStatusTrigger(
+                base_url=IMAGE_PROCESSOR_URL,
+                job_ids=[job['job_id'] for job in submitted_jobs],
+                deadline=time.time() + self.max_wait.total_seconds(),
+                poll_interval=self.poll_interval,
+                max_poll_interval=self.max_poll_interval,
+                max_failed_fraction=self.max_failed_fraction
+            ),
+            method_name='execute_complete'
+        )
+
+    def execute_complete(self, context: Dict[str, Any], event: Dict[str, Any]) -> dict:
+        submitted_jobs = context['task_instance'].xcom_pull(key='submitted_jobs')
+        statuses = event['jobs']
+
+        completed_jobs = []
+        failed_jobs = []
+        running_jobs = []
+
+        for job in submitted_jobs:
+            job_status = statuses.get(job['job_id'], {})
+            status = job_status.get('status')
+
+            if status == 'COMPLETED':
+                job['final_status'] = 'COMPLETED'
+                job['completed_at'] = job_status.get('completedAt')
+                job['output_path'] = job_status.get('outputPath')
+                completed_jobs.append(job)
+                logging.info(f"Job {job['job_id']} completed successfully")
+
+            elif status == 'FAILED':
+                job['final_status'] = 'FAILED'
+                job['error_message'] = job_status.get('errorMessage')
+                failed_jobs.append(job)
+                logging.error(f"Job {job['job_id']} failed: "
+                              f"{job_status.get('errorMessage')}")
+
+            else:
+                running_jobs.append(job)
+
+        result = self._publish(context, {
+            'completed': completed_jobs,
+            'failed': failed_jobs,
+            'running': running_jobs
+        })
+
+        if event['status'] == 'degraded':
+            raise ProcessingServiceDegradedError(len(failed_jobs), len(submitted_jobs))
+
+        return result
+
+    @staticmethod
+    def _publish(context: Dict[str, Any], result: dict) -> dict:
+        logging.info(f"Job monitoring complete: {len(result['completed'])} completed, "
+                     f"{len(result['failed'])} failed, "
+                     f"{len(result['running'])} still running")
+
+        context['task_instance'].xcom_push(key='job_results', value=result)
+
+        return result
+
+def _detected_objects(response: requests.Response) -> Iterator[Dict[str, Any]]:
+    """
+    Iterate the detectedObjects of a streamed job results response.
     
-    max_wait_time = 3600  # 1 hour maximum wait
-    check_interval = 30   # Check every 30 seconds
-    start_time = time.time()
+    With ijson installed the body is parsed incrementally, so memory stays
+    bounded however crowded the field; otherwise it is decoded in one go.
+    """
+    if ijson is not None:
+        response.raw.decode_content = True
+        return ijson.items(response.raw, 'detectedObjects.item', use_float=True)
+    return iter(json_loads(response.content).get('detectedObjects', []))
+
+def _catalog_job_objects(job: Dict[str, Any]) -> int:
+    """Add one job's detected objects to the catalog; returns the number added."""
+    job_id = job['job_id']
+    objects_added = 0
     
-    while time.time() - start_time < max_wait_time:
-        all_completed = True
-        
-        for job in submitted_jobs:
-            if job.get('final_status'):
-                continue  # Already processed
-                
-            job_id = job['job_id']
+    try:
+        # Get processing results with detected objects
+        with HTTP_SESSION.get(
+            f"{IMAGE_PROCESSOR_URL}/api/v1/processing/jobs/{job_id}/results",
+            stream=True,
+            timeout=30
+        ) as response:
             
-            try:
-                response = requests.get(
-                    f"{IMAGE_PROCESSOR_URL}/api/v1/processing/jobs/{job_id}",
-                    timeout=10
+            if response.status_code != 200:
+                logging.warning(f"Failed to get results for job {job_id}: "
+                                f"{response.status_code}")
+                return 0
+            
+            # Submit objects to catalog service in bounded batches
+            objects = _detected_objects(response)
+            while True:
+                batch = list(islice(objects, CATALOG_BATCH_SIZE))
+                if not batch:
+                    break
+                
+                catalog_response = HTTP_SESSION.post(
+                    f"{CATALOG_SERVICE_URL}/api/v1/catalog/objects/batch",
+                    data=json_dumps({'objects': batch}),
+                    headers=JSON_HEADERS,
+                    timeout=60
                 )
                 
-                if response.status_code == 200:
-                    job_status = response.json()
-                    status = job_status['status']
-                    
-                    if status == 'COMPLETED':
-                        job['final_status'] = 'COMPLETED'
-                        job['completed_at'] = job_status.get('completedAt')
-                        job['output_path'] = job_status.get('outputPath')
-                        completed_jobs.append(job)
-                        logging.info(f"Job {job_id} completed successfully")
-                        
-                    elif status == 'FAILED':
-                        job['final_status'] = 'FAILED'
-                        job['error_message'] = job_status.get('errorMessage')
-                        failed_jobs.append(job)
-                        logging.error(f"Job {job_id} failed: {job_status.get('errorMessage')}")
-                        
-                    else:
-                        all_completed = False
-                        running_jobs.append(job)
-                        
+                if catalog_response.status_code == 201:
+                    catalog_result = json_loads(catalog_response.content)
+                    objects_added += catalog_result.get('objectsAdded', 0)
                 else:
-                    logging.warning(f"Failed to get status for job {job_id}: {response.status_code}")
-                    all_completed = False
-                    
-            except Exception as e:
-                logging.error(f"Error checking job {job_id}: {e}")
-                all_completed = False
+                    logging.error(f"Failed to update catalog for job {job_id}: "
+                                f"{catalog_response.status_code}")
         
-        if all_completed:
-            break
-            
-        time.sleep(check_interval)
-    
-    result = {
-        'completed': completed_jobs,
-        'failed': failed_jobs, 
-        'running': running_jobs
-    }
-    
-    logging.info(f"Job monitoring complete: {len(completed_jobs)} completed, "
-                f"{len(failed_jobs)} failed, {len(running_jobs)} still running")
-    
-    context['task_instance'].xcom_push(key='job_results', value=result)
+        if objects_added:
+            logging.info(f"Added {objects_added} objects from job {job_id} to catalog")
+        
+    except Exception as e:
+        logging.error(f"Error updating catalog for job {job_id}: {e}")
     
-    return result
+    return objects_added
 
-def update_catalog(**context) -> dict:
+def _archive_job_output(job: Dict[str, Any], archive_prefix: str) -> bool:
+    """Copy one job's processed file into the archive bucket; returns True if copied."""
+    try:
+        if 'output_path' not in job:
+            return False
+        
+        # Copy processed file to archive bucket
+        source_key = job['output_path']
+        archive_key = f"{archive_prefix}/{source_key.split('/')[-1]}"
+        
+        get_s3_client().copy_object(
+            CopySource={'Bucket': S3_BUCKET_PROCESSED, 'Key': source_key},
+            Bucket=S3_BUCKET_ARCHIVE,
+            Key=archive_key
+        )
+        
+        logging.info(f"Archived {source_key} to {archive_key}")
+        return True
+        
+    except Exception as e:
+        logging.error(f"Error archiving file for job {job['job_id']}: {e}")
+        return False
+
+def _finalize_job(job: Dict[str, Any], archive_prefix: str) -> Tuple[int, bool]:
+    """Catalog and archive one completed job; returns (objects added, archived)."""
+    return _catalog_job_objects(job), _archive_job_output(job, archive_prefix)
+
+def finalize_completed_jobs(**context) -> dict:
     """
-    Update the astronomical catalog with processed image results.
+    Update the catalog and archive processed data for every completed job.
+    
+    Both steps are per-job and independent of other jobs, so each job is
+    finalized in one pass on a shared thread pool.
     """
     job_results = context['task_instance'].xcom_pull(key='job_results')
     completed_jobs = job_results.get('completed', [])
     
     if not completed_jobs:
-        logging.info("No completed jobs to update catalog")
-        return {'updated_objects': 0}
-    
-    logging.info(f"Updating catalog with results from {len(completed_jobs)} processed images")
-    
-    import requests
+        logging.info("No completed jobs to catalog or archive")
+        return {'updated_objects': 0, 'archived_files': 0}
     
-    updated_objects = 0
+    logging.info(f"Finalizing {len(completed_jobs)} processed images")
     
-    for job in completed_jobs:
-        try:
-            job_id = job['job_id']
-            
-            # Get processing results with detected objects
-            response = requests.get(
-                f"{IMAGE_PROCESSOR_URL}/api/v1/processing/jobs/{job_id}/results",
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                processing_results = response.json()
-                
-                # Extract detected astronomical objects
-                if 'detectedObjects' in processing_results:
-                    objects = processing_results['detectedObjects']
-                    
-                    # Submit objects to catalog service
-                    catalog_response = requests.post(
-                        f"{CATALOG_SERVICE_URL}/api/v1/catalog/objects/batch",
-                        json={'objects': objects},
-                        timeout=60
-                    )
-                    
-                    if catalog_response.status_code == 201:
-                        batch_result = catalog_response.json()
-                        objects_added = batch_result.get('objectsAdded', 0)
-                        updated_objects += objects_added
-                        logging.info(f"Added {objects_added} objects from job {job_id} to catalog")
-                    else:
-                        logging.error(f"Failed to update catalog for job {job_id}: "
-                                    f"{catalog_response.status_code}")
-                        
-            else:
-                logging.warning(f"Failed to get results for job {job_id}: {response.status_code}")
-                
-        except Exception as e:
-            logging.error(f"Error updating catalog for job {job['job_id']}: {e}")
+    archive_prefix = f"archive/{datetime.now().strftime('%Y/%m/%d')}"
+    workers = min(HTTP_WORKERS, len(completed_jobs))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        outcomes = list(executor.map(
+            lambda job: _finalize_job(job, archive_prefix), completed_jobs
+        ))
     
-    result = {'updated_objects': updated_objects}
-    logging.info(f"Catalog update complete: {updated_objects} objects added/updated")
+    result = {
+        'updated_objects': sum(objects_added for objects_added, _ in outcomes),
+        'archived_files': sum(1 for _, archived in outcomes if archived)
+    }
+    logging.info(f"Catalog update complete: {result['updated_objects']} "
+                 f"objects added/updated")
+    logging.info(f"Archival complete: {result['archived_files']} files archived")
     
     return result
 
-def archive_processed_data(**context) -> dict:
-    """
-    Archive processed data to long-term storage.
+def has_new_files(**context) -> bool:
+    """Short-circuit condition: discovery found at least one FITS file."""
+    discovery = context['task_instance'].xcom_pull(task_ids='discover_new_fits_files')
+    return bool(discovery and discovery['file_count'])
+
+def has_submitted_jobs(**context) -> bool:
+    """Short-circuit condition: at least one processing job was submitted."""
+    return bool(context['task_instance'].xcom_pull(
+        task_ids='image_processing.submit_processing_jobs'
+    ))
+
+def cleanup_temp_files(**context) -> dict:
     """
-    job_results = context['task_instance'].xcom_pull(key='job_results')
-    completed_jobs = job_results.get('completed', [])
+    Clean up temporary processing files older than 1 day.
     
-    if not completed_jobs:
-        logging.info("No data to archive")
-        return {'archived_files': 0}
-    
-    logging.info(f"Archiving {len(completed_jobs)} processed files")
-    
-    s3_client = boto3.client('s3')
-    archived_files = 0
+    Walks TEMP_DIR with os.scandir, matching names before stat-ing so only
+    candidate files cost a syscall. Uses the same age rule as
+    `find -mtime +1` (more than one whole day old). Symlinks are not followed.
+    """
+    now = time.time()
+    removed_files = 0
+    freed_bytes = 0
+    pending_dirs = [TEMP_DIR]
     
-    for job in completed_jobs:
+    while pending_dirs:
         try:
-            if 'output_path' in job:
-                # Copy processed file to archive bucket
-                source_key = job['output_path']
-                archive_key = f"archive/{datetime.now().strftime('%Y/%m/%d')}/{source_key.split('/')[-1]}"
-                
-                copy_source = {'Bucket': S3_BUCKET_PROCESSED, 'Key': source_key}
-                
-                s3_client.copy_object(
-                    CopySource=copy_source,
-                    Bucket=S3_BUCKET_ARCHIVE,
-                    Key=archive_key
-                )
-                
-                archived_files += 1
-                logging.info(f"Archived {source_key} to {archive_key}")
-                
-        except Exception as e:
-            logging.error(f"Error archiving file for job {job['job_id']}: {e}")
+            entries = os.scandir(pending_dirs.pop())
+        except OSError:
+            continue
+        
+        with entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending_dirs.append(entry.path)
+                        continue
+                    
+                    name = entry.name
+                    if not (name.endswith('.fits') or name.startswith('astro_')):
+                        continue
+                    
+                    stat = entry.stat(follow_symlinks=False)
+                    if (now - stat.st_mtime) // 86400 > 1:
+                        os.unlink(entry.path)
+                        removed_files += 1
+                        freed_bytes += stat.st_size
+                        
+                except OSError:
+                    # Vanished or not ours to delete; same as find's "|| true"
+                    continue
     
-    result = {'archived_files': archived_files}
-    logging.info(f"Archival complete: {archived_files} files archived")
+    logging.info(f"Cleanup completed: removed {removed_files} files, "
+                 f"freed {freed_bytes} bytes")
     
-    return result
+    return {'removed_files': removed_files, 'freed_bytes': freed_bytes}
 
 # Task definitions
 
@@ -404,6 +863,14 @@ discover_task = PythonOperator(
     dag=dag,
 )
 
+# Skip the rest of the run when discovery found nothing; cleanup still runs
+files_gate = ShortCircuitOperator(
+    task_id='gate_new_files',
+    python_callable=has_new_files,
+    ignore_downstream_trigger_rules=False,
+    dag=dag,
+)
+
 validate_task = PythonOperator(
     task_id='validate_fits_files', 
     python_callable=validate_fits_files,
@@ -418,23 +885,23 @@ with TaskGroup('image_processing', dag=dag) as processing_group:
         python_callable=submit_processing_jobs,
     )
     
-    monitor_jobs_task = PythonOperator(
+    # Skip monitoring when nothing was submitted
+    jobs_gate = ShortCircuitOperator(
+        task_id='gate_submitted_jobs',
+        python_callable=has_submitted_jobs,
+        ignore_downstream_trigger_rules=False,
+    )
+    
+    monitor_jobs_task = ProcessingJobsSensor(
         task_id='monitor_processing_jobs',
-        python_callable=monitor_processing_jobs,
     )
     
-    submit_jobs_task >> monitor_jobs_task
+    submit_jobs_task >> jobs_gate >> monitor_jobs_task
 
 # Catalog and archival
-update_catalog_task = PythonOperator(
-    task_id='update_catalog',
-    python_callable=update_catalog,
-    dag=dag,
-)
-
-archive_task = PythonOperator(
-    task_id='archive_processed_data',
-    python_callable=archive_processed_data,
+finalize_jobs_task = PythonOperator(
+    task_id='finalize_completed_jobs',
+    python_callable=finalize_completed_jobs,
     dag=dag,
 )
 
@@ -443,10 +910,11 @@ quality_check_task = PostgresOperator(
     task_id='quality_check',
     postgres_conn_id='astro_catalog_db',
     sql="""
+    -- Index-only range scan on idx_objects_created_at (covers object_type, magnitude)
     SELECT 
         COUNT(*) as total_objects,
-        COUNT(CASE WHEN object_type = 'STAR' THEN 1 END) as stars,
-        COUNT(CASE WHEN object_type = 'GALAXY' THEN 1 END) as galaxies,
+        COUNT(*) FILTER (WHERE object_type = 'STAR') as stars,
+        COUNT(*) FILTER (WHERE object_type = 'GALAXY') as galaxies,
         AVG(magnitude) as avg_magnitude
     FROM astronomical_objects 
     WHERE created_at >= NOW() - INTERVAL '1 hour';
@@ -454,40 +922,14 @@ quality_check_task = PostgresOperator(
     dag=dag,
 )
 
-cleanup_task = BashOperator(
+cleanup_task = PythonOperator(
     task_id='cleanup_temp_files',
-    bash_command="""
-    # Clean up temporary processing files older than 1 day
-    find /tmp -name "*.fits" -mtime +1 -delete || true
-    find /tmp -name "astro_*" -mtime +1 -delete || true
-    echo "Cleanup completed"
-    """,
-    dag=dag,
-)
-
-# Notification task (only runs on failure)
-failure_notification = EmailOperator(
-    task_id='send_failure_notification',
-    to=['astro-pipeline-alerts@example.com'],
-    subject='Airflow Alert: Telescope Data Processing Failed',
-    html_content="""
-    <h3>Telescope Data Processing Pipeline Failed</h3>
-    <p>The telescope data processing pipeline has encountered a failure.</p>
-    <p><strong>DAG:</strong> {{ dag.dag_id }}</p>
-    <p><strong>Execution Date:</strong> {{ ds }}</p>
-    <p><strong>Failed Task:</strong> {{ task_instance.task_id }}</p>
-    <p>Please check the Airflow logs for more details.</p>
-    """,
+    python_callable=cleanup_temp_files,
     dag=dag,
-    trigger_rule='one_failed',
+    trigger_rule='none_failed',
 )
 
 # Define task dependencies
-discover_task >> validate_task >> processing_group
-processing_group >> [update_catalog_task, archive_task, quality_check_task]
-[update_catalog_task, archive_task, quality_check_task] >> cleanup_task
-
-# Add failure notification to all main tasks
-for task in [discover_task, validate_task, processing_group, update_catalog_task, 
-             archive_task, quality_check_task]:
-    task >> failure_notification
\ No newline at end of file
+discover_task >> files_gate >> validate_task >> processing_group
+processing_group >> [finalize_jobs_task, quality_check_task]
+[finalize_jobs_task, quality_check_task] >> cleanup_task
@@ -8,10 +8,20 @@ Author: STScI Demo Project - Phase 3 Implementation
 """
 
 from typing import Dict, Any, List, Optional, Sequence
-import json
+import asyncio
+import base64
 import logging
+import os
+import threading
+import time
+import zlib
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
+from functools import lru_cache
+from types import MappingProxyType
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from airflow.models import BaseOperator
 from airflow.utils.decorators import apply_defaults
@@ -20,10 +30,177 @@ from airflow.hooks.http_hook import HttpHook
 from airflow.providers.http.operators.http import SimpleHttpOperator
 from airflow.configuration import conf
 from airflow.models import Variable
+from airflow.plugins.pipeline_common import json_dumps, json_loads
 
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=1)
+def _image_processor_base_url() -> str:
+    """
+    Image processor base URL from Airflow Variables, read once per process.
+
+    Every operator instance needs it, and instances are built on each DAG
+    parse; caching keeps that to a single metadata DB query.
+    """
+    return Variable.get(
+        "image_processor_base_url",
+        "http://image-processor-service:8080"
+    )
+
+
+# Metrics larger than this (serialized bytes) are zlib-compressed before
+# going into XCom, keeping large rows out of the metadata database
+METRICS_COMPRESSION_THRESHOLD = 16 * 1024
+
+
+def _pack_metrics(metrics: Any) -> Any:
+    """Prepare metrics for XCom, compressing them when they are large."""
+    serialized = json_dumps(metrics)
+    if len(serialized) <= METRICS_COMPRESSION_THRESHOLD:
+        return metrics
+    return {
+        '_compressed': True,
+        'data': base64.b64encode(zlib.compress(serialized, 1)).decode('ascii')
+    }
+
+
+def load_metrics(value: Any) -> Any:
+    """
+    Inverse of _pack_metrics for metrics pulled from XCom; other values pass
+    through.
+    """
+    if isinstance(value, dict) and value.get('_compressed'):
+        return json_loads(zlib.decompress(base64.b64decode(value['data'])))
+    return value
+
+
+# Transient failures are retried here, in about a second, rather than by
+# re-running the whole task. Only GETs are retried in general; read timeouts
+# are never retried, so the original ReadTimeout reaches the caller.
+HTTP_RETRY = Retry(
+    total=5,
+    read=False,
+    backoff_factor=0.3,
+    status_forcelist=(429, 502, 503, 504),
+    allowed_methods=frozenset(['GET']),
+    respect_retry_after_header=True
+)
+
+# Granular step POSTs may also be resent: a repeated step only writes another
+# timestamped intermediate object. Workflow and promotion POSTs are not
+# retried, since repeating them can run or promote a workflow twice.
+STEP_HTTP_RETRY = Retry(
+    total=5,
+    read=False,
+    backoff_factor=0.3,
+    status_forcelist=(429, 502, 503, 504),
+    allowed_methods=frozenset(['GET', 'POST']),
+    respect_retry_after_header=True
+)
+
+
+def pull_state(ti, task_id: str) -> Dict[str, Any]:
+    """
+    Return the workflow info and metrics a step task stored in XCom.
+
+    Reads the ``{task_id}_state`` value written by the step operators; both
+    entries are None when the task stored nothing.
+    """
+    state = ti.xcom_pull(task_ids=task_id, key=f"{task_id}_state") or {}
+    return {
+        'workflow_info': state.get('workflow_info'),
+        'metrics': load_metrics(state.get('metrics'))
+    }
+
+
+# Pooled session shared by every operator in a worker process; rebuilt after
+# a fork so child processes never reuse the parent's sockets
+_HTTP_SESSION = None
+_HTTP_SESSION_PID = None
+_HTTP_SESSION_LOCK = threading.Lock()
+
+
+def _http_session() -> requests.Session:
+    """Return the process-wide keep-alive session for image-processor calls."""
+    global _HTTP_SESSION, _HTTP_SESSION_PID
+    with _HTTP_SESSION_LOCK:
+        if _HTTP_SESSION is None or _HTTP_SESSION_PID != os.getpid():
+            session = requests.Session()
+            # The image processor gzips JSON responses (server.compression);
+            # request it explicitly rather than relying on library defaults
+            session.headers.update({'Accept-Encoding': 'gzip, deflate'})
+            adapter = HTTPAdapter(
+                pool_connections=50,
+                pool_maxsize=50,
+                max_retries=HTTP_RETRY
+            )
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            # requests picks the longest matching prefix, so only the
+            # granular step endpoints get POST retries
+            session.mount(
+                f"{_image_processor_base_url()}/api/v1/processing/steps/",
+                HTTPAdapter(pool_connections=50, pool_maxsize=50,
+                            max_retries=STEP_HTTP_RETRY)
+            )
+            _HTTP_SESSION = session
+            _HTTP_SESSION_PID = os.getpid()
+        return _HTTP_SESSION
+
+
+# Granular processing step -> workflow name, and the reverse for endpoint lookup
+_STEP_TO_WORKFLOW = MappingProxyType({
+    'bias-subtract': 'bias-subtraction',
+    'dark-subtract': 'dark-subtraction',
+    'flat-correct': 'flat-field-correction',
+    'cosmic-ray-remove': 'cosmic-ray-removal'
+})
+_WORKFLOW_TO_STEP = MappingProxyType({
+    workflow: step for step, workflow in _STEP_TO_WORKFLOW.items()
+})
+
+# Active workflows per (base_url, processing_type), reused for a short TTL so
+# the many step tasks of one run share a single lookup per worker process
+ACTIVE_WORKFLOW_CACHE_TTL = 60
+_ACTIVE_WORKFLOW_CACHE: Dict[tuple, tuple] = {}
+_ACTIVE_WORKFLOW_CACHE_LOCK = threading.Lock()
+
+
+def _active_workflows(base_url: str, processing_type: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Return the active workflows for a processing type, keyed by workflow name.
+
+    Raises requests.exceptions.RequestException when the lookup fails; failed
+    lookups are not cached.
+    """
+    cache_key = (base_url, processing_type)
+    with _ACTIVE_WORKFLOW_CACHE_LOCK:
+        cached = _ACTIVE_WORKFLOW_CACHE.get(cache_key)
+    if cached and time.monotonic() - cached[0] < ACTIVE_WORKFLOW_CACHE_TTL:
+        return cached[1]
+
+    try:
+        response = _http_session().get(
+            f"{base_url}/api/v1/workflows/active",
+            params={'processingType': processing_type},
+            timeout=30
+        )
+        response.raise_for_status()
+    except requests.exceptions.RequestException:
+        with _ACTIVE_WORKFLOW_CACHE_LOCK:
+            _ACTIVE_WORKFLOW_CACHE.pop(cache_key, None)
+        raise
+
+    workflows = {
+        workflow.get('workflowName'): workflow
+        for workflow in json_loads(response.content)
+    }
+    with _ACTIVE_WORKFLOW_CACHE_LOCK:
+        _ACTIVE_WORKFLOW_CACHE[cache_key] = (time.monotonic(), workflows)
+    return workflows
+
+
 class GranularProcessingOperator(BaseOperator):
     """
     Base operator for granular astronomical processing operations.
@@ -72,7 +249,7 @@ class GranularProcessingOperator(BaseOperator):
         force_workflow_version: bool = False,
         **kwargs
     ) -> None:
-        super().__init__(**kwargs)
+        super().__init__(retries=retries, retry_delay=retry_delay, **kwargs)
         self.image_path = image_path
         self.session_id = session_id
         self.algorithm = algorithm
@@ -101,12 +278,28 @@ class GranularProcessingOperator(BaseOperator):
         self.force_workflow_version = force_workflow_version
 
         # Get base URL from Airflow Variables
-        self.base_url = Variable.get(
-            "image_processor_base_url",
-            "http://image-processor-service:8080"
-        )
+        self.base_url = _image_processor_base_url()
+        self._step_url_prefix = f"{self.base_url}/api/v1/processing/steps/"
+
+        # Request payload, built on first use and reset when templates render
+        self._request_payload: Optional[Dict[str, Any]] = None
+
+    def render_template_fields(self, context, jinja_env=None) -> None:
+        super().render_template_fields(context, jinja_env)
+        self._request_payload = None
 
     def _build_request_payload(self) -> Dict[str, Any]:
+        """
+        Return the request payload for granular processing.
+
+        Every input is fixed once templates are rendered, so the payload is
+        assembled once per task and shared; callers must copy before changing it.
+        """
+        if self._request_payload is None:
+            self._request_payload = self._assemble_request_payload()
+        return self._request_payload
+
+    def _assemble_request_payload(self) -> Dict[str, Any]:
         """Build the request payload for granular processing."""
         payload = {
             'imagePath': self.image_path,
@@ -167,91 +360,94 @@ class GranularProcessingOperator(BaseOperator):
         """Get active workflow information for the processing step."""
         try:
             # Map processing step to workflow name
-            workflow_name = self._map_step_to_workflow(step_type)
+            workflow_name = _STEP_TO_WORKFLOW.get(step_type)
             if not workflow_name:
                 return None
 
-            url = f"{self.base_url}/api/v1/workflows/active"
-            params = {'processingType': self.processing_type}
-
-            response = requests.get(url, params=params, timeout=30)
-            response.raise_for_status()
-
-            active_workflows = response.json()
-
             # Find the active workflow for this step
-            for workflow in active_workflows:
-                if workflow.get('workflowName') == workflow_name:
-                    logger.info(f"Using active workflow {workflow_name} version {workflow.get('workflowVersion')} "
-                              f"(deterministic processing - always 100%)")
-
-                    return {
-                        'workflowName': workflow.get('workflowName'),
-                        'workflowVersion': workflow.get('workflowVersion'),
-                        'deterministic': True,
-                        'activeWorkflowMetadata': {
-                            'activatedBy': workflow.get('activatedBy'),
-                            'activatedAt': workflow.get('activatedAt'),
-                            'algorithmConfiguration': workflow.get('algorithmConfiguration', {})
-                        }
+            workflows = _active_workflows(self.base_url, self.processing_type)
+            workflow = workflows.get(workflow_name)
+            if workflow:
+                logger.info("Using active workflow %s version %s "
+                            "(deterministic processing - always 100%%)",
+                            workflow_name, workflow.get('workflowVersion'))
+
+                return {
+                    'workflowName': workflow.get('workflowName'),
+                    'workflowVersion': workflow.get('workflowVersion'),
+                    'deterministic': True,
+                    'activeWorkflowMetadata': {
+                        'activatedBy': workflow.get('activatedBy'),
+                        'activatedAt': workflow.get('activatedAt'),
+                        'algorithmConfiguration':
+                            workflow.get('algorithmConfiguration', {})
                     }
+                }
 
-            logger.warning(f"No active workflow found for {workflow_name} in {self.processing_type} mode")
+            logger.warning("No active workflow found for %s in %s mode",
+                           workflow_name, self.processing_type)
             return None
 
         except requests.exceptions.RequestException as e:
-            logger.warning(f"Failed to get active workflow info: {e}")
+            logger.warning("Failed to get active workflow info: %s", e)
             return None
 
     def _map_step_to_workflow(self, step_type: str) -> Optional[str]:
         """Map processing step type to workflow name."""
-        step_workflow_mapping = {
-            'bias-subtract': 'bias-subtraction',
-            'dark-subtract': 'dark-subtraction',
-            'flat-correct': 'flat-field-correction',
-            'cosmic-ray-remove': 'cosmic-ray-removal'
-        }
-        return step_workflow_mapping.get(step_type)
+        return _STEP_TO_WORKFLOW.get(step_type)
 
     def _make_request(self, endpoint: str, payload: Dict[str, Any]) -> Dict[str, Any]:
         """Make HTTP request to granular processing endpoint."""
-        url = f"{self.base_url}/api/v1/processing/steps/{endpoint}"
+        url = self._step_url_prefix + endpoint
 
         try:
-            response = requests.post(
+            response = _http_session().post(
                 url,
-                json=payload,
+                data=json_dumps(payload),
                 headers={'Content-Type': 'application/json'},
                 timeout=self.timeout
             )
             response.raise_for_status()
 
-            result = response.json()
-            logger.info(f"Processing step {endpoint} completed successfully")
+            result = json_loads(response.content)
+            logger.info("Processing step %s completed successfully", endpoint)
 
             return result
 
         except requests.exceptions.Timeout:
             raise AirflowException(f"Processing step {endpoint} timed out after {self.timeout} seconds")
         except requests.exceptions.RequestException as e:
-            logger.error(f"Processing step {endpoint} failed: {e}")
+            logger.error("Processing step %s failed: %s", endpoint, e)
             if hasattr(e, 'response') and e.response is not None:
                 try:
                     error_detail = e.response.json()
-                    logger.error(f"Error details: {error_detail}")
+                    logger.error("Error details: %s", error_detail)
                 except:
-                    logger.error(f"Response text: {e.response.text}")
+                    logger.error("Response text: %s", e.response.text)
             raise AirflowException(f"Failed to execute {endpoint}: {e}")
 
-    def _store_metrics(self, context: Dict, result: Dict[str, Any]) -> None:
-        """Store processing metrics in XCom for analysis."""
-        if 'processingMetrics' in result:
-            metrics = result['processingMetrics']
-            context['ti'].xcom_push(
-                key=f"{self.task_id}_metrics",
-                value=metrics
-            )
-            logger.info(f"Stored processing metrics for {self.task_id}")
+    def _store_state(self, context: Dict, metrics: Any,
+                     workflow_info: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Store workflow info and processing metrics for downstream tasks as one
+        ``{task_id}_state`` XCom.
+
+        Nothing is written when both are empty; large metrics are compressed,
+        so consumers should read them with pull_state or load_metrics.
+        """
+        if not self.enable_metrics:
+            metrics = None
+        if not workflow_info and not metrics:
+            return
+
+        context['ti'].xcom_push(
+            key=f"{self.task_id}_state",
+            value={
+                'workflow_info': workflow_info,
+                'metrics': _pack_metrics(metrics) if metrics else None
+            }
+        )
+        logger.info("Stored processing state for %s", self.task_id)
 
     def execute(self, context: Dict) -> str:
         """Execute the processing step - to be implemented by subclasses."""
@@ -277,33 +473,42 @@ class BiasSubtractionOperator(GranularProcessingOperator):
         if 'parameters' not in kwargs:
             kwargs['parameters'] = {}
 
-        kwargs['parameters'].update({
-            'overscanCorrection': overscan_correction,
-            'fitMethod': fit_method
-        })
+        kwargs['parameters'].update(
+            BiasSubtractionOperator.build_parameters(overscan_correction, fit_method)
+        )
 
         super().__init__(*args, **kwargs)
 
+    @staticmethod
+    def build_parameters(
+        overscan_correction: bool = True,
+        fit_method: str = 'median'
+    ) -> Dict[str, Any]:
+        """Request parameters for a bias subtraction step."""
+        return {
+            'overscanCorrection': overscan_correction,
+            'fitMethod': fit_method
+        }
+
     def execute(self, context: Dict) -> str:
         """Execute bias subtraction processing."""
-        logger.info(f"Starting bias subtraction for {self.image_path}")
+        logger.info("Starting bias subtraction for %s", self.image_path)
 
         # Get active workflow info if enabled
+        workflow_info = None
         if self.use_active_workflow and not self.force_workflow_version and not self.workflow_name:
             workflow_info = self._get_active_workflow_info('bias-subtract')
             if workflow_info:
-                logger.info(f"Using active workflow: {workflow_info}")
-                # Store workflow info in XCom for downstream tasks
-                context['ti'].xcom_push(key='active_workflow_info', value=workflow_info)
+                logger.info("Using active workflow: %s", workflow_info)
 
         payload = self._build_request_payload()
         result = self._make_request('bias-subtract', payload)
 
-        # Store metrics
-        self._store_metrics(context, result)
+        # Store workflow info and metrics for downstream tasks
+        self._store_state(context, result.get('processingMetrics'), workflow_info)
 
         output_path = result['outputPath']
-        logger.info(f"Bias subtraction completed: {output_path}")
+        logger.info("Bias subtraction completed: %s", output_path)
 
         return output_path
 
@@ -327,25 +532,35 @@ class DarkSubtractionOperator(GranularProcessingOperator):
         if 'parameters' not in kwargs:
             kwargs['parameters'] = {}
 
-        kwargs['parameters'].update({
-            'autoScale': auto_scale,
-            'temperatureCorrection': temperature_correction
-        })
+        kwargs['parameters'].update(
+            DarkSubtractionOperator.build_parameters(auto_scale, temperature_correction)
+        )
 
         super().__init__(*args, **kwargs)
 
+    @staticmethod
+    def build_parameters(
+        auto_scale: bool = True,
+        temperature_correction: bool = False
+    ) -> Dict[str, Any]:
+        """Request parameters for a dark subtraction step."""
+        return {
+            'autoScale': auto_scale,
+            'temperatureCorrection': temperature_correction
+        }
+
     def execute(self, context: Dict) -> str:
         """Execute dark subtraction processing."""
-        logger.info(f"Starting dark subtraction for {self.image_path}")
+        logger.info("Starting dark subtraction for %s", self.image_path)
 
         payload = self._build_request_payload()
         result = self._make_request('dark-subtract', payload)
 
         # Store metrics
-        self._store_metrics(context, result)
+        self._store_state(context, result.get('processingMetrics'))
 
         output_path = result['outputPath']
-        logger.info(f"Dark subtraction completed: {output_path}")
+        logger.info("Dark subtraction completed: %s", output_path)
 
         return output_path
 
@@ -370,26 +585,39 @@ class FlatFieldCorrectionOperator(GranularProcessingOperator):
         if 'parameters' not in kwargs:
             kwargs['parameters'] = {}
 
-        kwargs['parameters'].update({
+        kwargs['parameters'].update(
+            FlatFieldCorrectionOperator.build_parameters(
+                normalization_method, illumination_model, mask_stars
+            )
+        )
+
+        super().__init__(*args, **kwargs)
+
+    @staticmethod
+    def build_parameters(
+        normalization_method: str = 'median',
+        illumination_model: str = 'polynomial',
+        mask_stars: bool = True
+    ) -> Dict[str, Any]:
+        """Request parameters for a flat field correction step."""
+        return {
             'normalizationMethod': normalization_method,
             'illuminationModel': illumination_model,
             'maskStars': mask_stars
-        })
-
-        super().__init__(*args, **kwargs)
+        }
 
     def execute(self, context: Dict) -> str:
         """Execute flat field correction processing."""
-        logger.info(f"Starting flat field correction for {self.image_path}")
+        logger.info("Starting flat field correction for %s", self.image_path)
 
         payload = self._build_request_payload()
         result = self._make_request('flat-correct', payload)
 
         # Store metrics
-        self._store_metrics(context, result)
+        self._store_state(context, result.get('processingMetrics'))
 
         output_path = result['outputPath']
-        logger.info(f"Flat field correction completed: {output_path}")
+        logger.info("Flat field correction completed: %s", output_path)
 
         return output_path
 
@@ -410,31 +638,45 @@ class CosmicRayRemovalOperator(GranularProcessingOperator):
         niter: int = 4,
         **kwargs
     ) -> None:
-        # Set default cosmic ray removal parameters
-        if 'parameters' not in kwargs:
-            kwargs['parameters'] = {}
+        # Default cosmic ray removal parameters; explicit parameters win so
+        # that mapped instances (``.expand(parameters=...)``) keep their values
+        kwargs['parameters'] = {
+            **CosmicRayRemovalOperator.build_parameters(
+                sigclip, star_preservation, niter
+            ),
+            **(kwargs.get('parameters') or {})
+        }
+
+        super().__init__(*args, **kwargs)
 
-        kwargs['parameters'].update({
+    @staticmethod
+    def build_parameters(
+        sigclip: float = 4.5,
+        star_preservation: bool = True,
+        niter: int = 4
+    ) -> Dict[str, Any]:
+        """Request parameters for a cosmic ray removal step."""
+        return {
             'sigclip': sigclip,
             'starPreservation': star_preservation,
             'niter': niter
-        })
-
-        super().__init__(*args, **kwargs)
+        }
 
     def execute(self, context: Dict) -> str:
         """Execute cosmic ray removal processing."""
-        logger.info(f"Starting cosmic ray removal for {self.image_path}")
+        logger.info("Starting cosmic ray removal for %s", self.image_path)
 
         payload = self._build_request_payload()
         result = self._make_request('cosmic-ray-remove', payload)
 
         # Store metrics
-        self._store_metrics(context, result)
+        self._store_state(context, result.get('processingMetrics'))
 
         output_path = result['outputPath']
-        cosmic_rays_removed = result.get('processingMetrics', {}).get('cosmicRaysRemoved', 0)
-        logger.info(f"Cosmic ray removal completed: {output_path} ({cosmic_rays_removed} cosmic rays removed)")
+        if logger.isEnabledFor(logging.INFO):
+            removed = result.get('processingMetrics', {}).get('cosmicRaysRemoved', 0)
+            logger.info("Cosmic ray removal completed: %s (%s cosmic rays removed)",
+                        output_path, removed)
 
         return output_path
 
@@ -460,25 +702,33 @@ class AlgorithmDiscoveryOperator(BaseOperator):
         self.require_supported = require_supported
 
         # Get base URL from Airflow Variables
-        self.base_url = Variable.get(
-            "image_processor_base_url",
-            "http://image-processor-service:8080"
+        self.base_url = _image_processor_base_url()
+        self._algorithms_url_prefix = f"{self.base_url}/api/v1/processing/algorithms/"
+
+    def _fetch_algorithms(self, algorithm_type: str) -> List[Dict[str, Any]]:
+        """
+        Return the registry entries for one algorithm type, optionally only
+        supported ones.
+        """
+        response = _http_session().get(
+            self._algorithms_url_prefix + algorithm_type,
+            timeout=30
         )
+        response.raise_for_status()
 
-    def execute(self, context: Dict) -> List[Dict[str, Any]]:
-        """Discover available algorithms for the specified type."""
-        url = f"{self.base_url}/api/v1/processing/algorithms/{self.algorithm_type}"
+        algorithms = json_loads(response.content)
 
-        try:
-            response = requests.get(url, timeout=30)
-            response.raise_for_status()
+        if self.require_supported:
+            algorithms = [algo for algo in algorithms if algo.get('supported', False)]
 
-            algorithms = response.json()
+        logger.info("Found %s algorithms for %s", len(algorithms), algorithm_type)
 
-            if self.require_supported:
-                algorithms = [algo for algo in algorithms if algo.get('supported', False)]
+        return algorithms
 
-            logger.info(f"Found {len(algorithms)} algorithms for {self.algorithm_type}")
+    def execute(self, context: Dict) -> List[Dict[str, Any]]:
+        """Discover available algorithms for the specified type."""
+        try:
+            algorithms = self._fetch_algorithms(self.algorithm_type)
 
             # Store in XCom for downstream tasks
             context['ti'].xcom_push(
@@ -489,10 +739,59 @@ class AlgorithmDiscoveryOperator(BaseOperator):
             return algorithms
 
         except requests.exceptions.RequestException as e:
-            logger.error(f"Failed to discover algorithms for {self.algorithm_type}: {e}")
+            logger.error("Failed to discover algorithms for %s: %s",
+                         self.algorithm_type, e)
             raise AirflowException(f"Algorithm discovery failed: {e}")
 
 
+class BatchAlgorithmDiscoveryOperator(AlgorithmDiscoveryOperator):
+    """
+    Operator for discovering algorithms for several processing steps in one task.
+
+    The registry has no batch endpoint, so the per-type lookups run
+    concurrently over the shared session. Results are pushed under the same
+    ``{algorithm_type}_algorithms`` keys as AlgorithmDiscoveryOperator and
+    returned as a dict keyed by algorithm type.
+    """
+
+    template_fields: Sequence[str] = ('algorithm_types',)
+
+    @apply_defaults
+    def __init__(
+        self,
+        algorithm_types: List[str],
+        require_supported: bool = True,
+        **kwargs
+    ) -> None:
+        super().__init__(algorithm_type=None, require_supported=require_supported,
+                         **kwargs)
+        self.algorithm_types = algorithm_types
+
+    def execute(self, context: Dict) -> Dict[str, List[Dict[str, Any]]]:
+        """Discover available algorithms for every requested type."""
+        algorithm_types = list(dict.fromkeys(self.algorithm_types))
+        if not algorithm_types:
+            return {}
+
+        try:
+            with ThreadPoolExecutor(max_workers=len(algorithm_types)) as executor:
+                fetched = executor.map(self._fetch_algorithms, algorithm_types)
+                discovered = dict(zip(algorithm_types, fetched))
+
+        except requests.exceptions.RequestException as e:
+            logger.error("Failed to discover algorithms for %s: %s", algorithm_types, e)
+            raise AirflowException(f"Algorithm discovery failed: {e}")
+
+        # Store in XCom for downstream tasks
+        for algorithm_type, algorithms in discovered.items():
+            context['ti'].xcom_push(
+                key=f"{algorithm_type}_algorithms",
+                value=algorithms
+            )
+
+        return discovered
+
+
 class CustomWorkflowOperator(BaseOperator):
     """
     Operator for executing custom processing workflows.
@@ -527,34 +826,33 @@ class CustomWorkflowOperator(BaseOperator):
         self.timeout = timeout
 
         # Get base URL from Airflow Variables
-        self.base_url = Variable.get(
-            "image_processor_base_url",
-            "http://image-processor-service:8080"
-        )
+        self.base_url = _image_processor_base_url()
+        self._workflow_url = f"{self.base_url}/api/v1/processing/workflows/custom"
 
     def execute(self, context: Dict) -> Dict[str, Any]:
         """Execute custom workflow with multiple processing steps."""
-        url = f"{self.base_url}/api/v1/processing/workflows/custom"
+        url = self._workflow_url
 
         payload = {
-            'inputImagePath': self.input_image_path,
+            'imagePath': self.input_image_path,
             'sessionId': self.session_id,
             'steps': self.workflow_steps,
             'outputConfiguration': self.output_configuration
         }
 
         try:
-            logger.info(f"Starting custom workflow with {len(self.workflow_steps)} steps")
+            logger.info("Starting custom workflow with %s steps",
+                        len(self.workflow_steps))
 
-            response = requests.post(
+            response = _http_session().post(
                 url,
-                json=payload,
+                data=json_dumps(payload),
                 headers={'Content-Type': 'application/json'},
                 timeout=self.timeout
             )
             response.raise_for_status()
 
-            result = response.json()
+            result = json_loads(response.content)
 
             # Store comprehensive workflow metrics
             context['ti'].xcom_push(
@@ -562,17 +860,182 @@ class CustomWorkflowOperator(BaseOperator):
                 value=result.get('workflowMetrics', {})
             )
 
-            logger.info(f"Custom workflow completed: {result['finalOutputPath']}")
+            logger.info("Custom workflow completed: %s", result['finalOutputPath'])
 
             return result
 
         except requests.exceptions.Timeout:
             raise AirflowException(f"Custom workflow timed out after {self.timeout} seconds")
         except requests.exceptions.RequestException as e:
-            logger.error(f"Custom workflow failed: {e}")
+            logger.error("Custom workflow failed: %s", e)
             raise AirflowException(f"Failed to execute custom workflow: {e}")
 
 
+# Calibration steps in processing order, with the operator that builds each
+# step's parameters
+CALIBRATION_STEP_OPERATORS = {
+    'bias-subtract': BiasSubtractionOperator,
+    'dark-subtract': DarkSubtractionOperator,
+    'flat-correct': FlatFieldCorrectionOperator,
+    'cosmic-ray-remove': CosmicRayRemovalOperator
+}
+
+
+class CalibrationPipelineOperator(CustomWorkflowOperator):
+    """
+    Operator running the bias, dark, flat and cosmic ray steps for one image
+    as a single custom workflow request.
+
+    Preferred over chaining the individual step operators: one HTTP round trip
+    and one task instance per image instead of four. Per-step metrics are
+    returned in the result's ``stepResults`` rather than pushed as separate
+    XComs.
+    """
+
+    @apply_defaults
+    def __init__(
+        self,
+        input_image_path: str,
+        session_id: str,
+        steps: Sequence[str] = tuple(CALIBRATION_STEP_OPERATORS),
+        algorithms: Optional[Dict[str, str]] = None,
+        step_parameters: Optional[Dict[str, Dict[str, Any]]] = None,
+        calibration_paths: Optional[Dict[str, str]] = None,
+        **kwargs
+    ) -> None:
+        algorithms = algorithms or {}
+        step_parameters = step_parameters or {}
+        calibration_paths = calibration_paths or {}
+
+        workflow_steps = []
+        for step_type in steps:
+            if step_type not in CALIBRATION_STEP_OPERATORS:
+                raise AirflowException(f"Unsupported calibration step: {step_type}")
+
+            step = {
+                'stepType': step_type,
+                'algorithm': algorithms.get(step_type, 'default'),
+                'parameters': {
+                    **CALIBRATION_STEP_OPERATORS[step_type].build_parameters(),
+                    **step_parameters.get(step_type, {})
+                }
+            }
+            if calibration_paths.get(step_type):
+                step['calibrationPath'] = calibration_paths[step_type]
+            workflow_steps.append(step)
+
+        super().__init__(
+            input_image_path=input_image_path,
+            session_id=session_id,
+            workflow_steps=workflow_steps,
+            **kwargs
+        )
+
+
+class BatchGranularProcessingOperator(GranularProcessingOperator):
+    """
+    Operator running one calibration step over many images from a single task.
+
+    Instead of one mapped task instance per image, requests are fired
+    concurrently over a shared aiohttp session, at most max_concurrency at a
+    time. Returns the output paths in image_paths order and pushes the
+    per-image metrics as one list in ``{task_id}_state``. The task fails
+    after every request has finished if any image failed.
+    """
+
+    template_fields: Sequence[str] = (
+        GranularProcessingOperator.template_fields + ('image_paths',)
+    )
+
+    @apply_defaults
+    def __init__(
+        self,
+        step_type: str,
+        image_paths: List[str],
+        max_concurrency: int = 16,
+        **kwargs
+    ) -> None:
+        if step_type not in CALIBRATION_STEP_OPERATORS:
+            raise AirflowException(f"Unsupported calibration step: {step_type}")
+        if kwargs.get('output_path'):
+            raise AirflowException(
+                "output_path cannot be shared by a batch; use output_bucket instead"
+            )
+
+        # Step defaults, overridden by explicit parameters
+        kwargs['parameters'] = {
+            **CALIBRATION_STEP_OPERATORS[step_type].build_parameters(),
+            **(kwargs.get('parameters') or {})
+        }
+
+        super().__init__(image_path=None, **kwargs)
+        self.step_type = step_type
+        self._step_url = self._step_url_prefix + step_type
+        self.image_paths = image_paths
+        self.max_concurrency = max_concurrency
+
+    async def _post_one(self, semaphore, session, image_path: str) -> Dict[str, Any]:
+        """Process one image; returns the step result or an error entry."""
+        import aiohttp
+
+        payload = {**self._build_request_payload(), 'imagePath': image_path}
+        url = self._step_url
+
+        async with semaphore:
+            try:
+                async with session.post(
+                    url, data=json_dumps(payload),
+                    headers={'Content-Type': 'application/json'}
+                ) as response:
+                    body = await response.read()
+                    if response.status >= 400:
+                        return {
+                            'imagePath': image_path,
+                            'error': f"HTTP {response.status}: {body[:500]!r}"
+                        }
+                    return json_loads(body)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                return {'imagePath': image_path, 'error': str(e) or type(e).__name__}
+
+    async def _run_all(self) -> List[Dict[str, Any]]:
+        import aiohttp
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        connector = aiohttp.TCPConnector(limit=64, keepalive_timeout=60,
+                                         ttl_dns_cache=300)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+
+        async with aiohttp.ClientSession(connector=connector,
+                                         timeout=timeout) as session:
+            return await asyncio.gather(*(
+                self._post_one(semaphore, session, image_path)
+                for image_path in self.image_paths
+            ))
+
+    def execute(self, context: Dict) -> List[str]:
+        """Execute the step for every image."""
+        logger.info("Starting %s for %s images (%s concurrent requests)",
+                    self.step_type, len(self.image_paths), self.max_concurrency)
+
+        results = asyncio.run(self._run_all())
+
+        failures = [result for result in results if 'error' in result]
+        for failure in failures:
+            logger.error("%s failed for %s: %s",
+                         self.step_type, failure['imagePath'], failure['error'])
+        if failures:
+            raise AirflowException(f"{self.step_type} failed for {len(failures)} "
+                                   f"of {len(results)} images")
+
+        self._store_state(
+            context, [result.get('processingMetrics') for result in results]
+        )
+
+        logger.info("%s completed for %s images", self.step_type, len(results))
+
+        return [result['outputPath'] for result in results]
+
+
 class IntermediateResultsOperator(BaseOperator):
     """
     Operator for managing intermediate processing results.
@@ -596,10 +1059,7 @@ class IntermediateResultsOperator(BaseOperator):
         self.keep_final_result = keep_final_result
 
         # Get base URL from Airflow Variables
-        self.base_url = Variable.get(
-            "image_processor_base_url",
-            "http://image-processor-service:8080"
-        )
+        self.base_url = _image_processor_base_url()
 
     def execute(self, context: Dict) -> Any:
         """Execute intermediate results operation."""
@@ -615,11 +1075,12 @@ class IntermediateResultsOperator(BaseOperator):
         url = f"{self.base_url}/api/v1/processing/intermediate/{self.session_id}/results"
 
         try:
-            response = requests.get(url, timeout=30)
+            response = _http_session().get(url, timeout=30)
             response.raise_for_status()
 
-            intermediate_files = response.json()
-            logger.info(f"Found {len(intermediate_files)} intermediate files for session {self.session_id}")
+            intermediate_files = json_loads(response.content)
+            logger.info("Found %s intermediate files for session %s",
+                        len(intermediate_files), self.session_id)
 
             # Store in XCom
             context['ti'].xcom_push(
@@ -630,7 +1091,7 @@ class IntermediateResultsOperator(BaseOperator):
             return intermediate_files
 
         except requests.exceptions.RequestException as e:
-            logger.error(f"Failed to list intermediate results: {e}")
+            logger.error("Failed to list intermediate results: %s", e)
             raise AirflowException(f"Failed to list intermediate results: {e}")
 
     def _cleanup_intermediate_results(self, context: Dict) -> Dict[str, Any]:
@@ -638,8 +1099,8 @@ class IntermediateResultsOperator(BaseOperator):
         # This would call the IntermediateStorageService.cleanupSessionFiles method
         # For now, we'll simulate the cleanup operation
 
-        logger.info(f"Cleaning up intermediate files for session {self.session_id}")
-        logger.info(f"Keep final result: {self.keep_final_result}")
+        logger.info("Cleaning up intermediate files for session %s", self.session_id)
+        logger.info("Keep final result: %s", self.keep_final_result)
 
         # In a real implementation, this would call the cleanup endpoint
         cleanup_result = {
@@ -694,14 +1155,13 @@ class ActiveWorkflowOperator(BaseOperator):
         self.timeout = timeout
 
         # Get base URL from Airflow Variables
-        self.base_url = Variable.get(
-            "image_processor_base_url",
-            "http://image-processor-service:8080"
-        )
+        self.base_url = _image_processor_base_url()
+        self._step_url_prefix = f"{self.base_url}/api/v1/processing/steps/"
 
     def execute(self, context: Dict) -> Dict[str, Any]:
         """Execute processing using the active workflow version."""
-        logger.info(f"Starting active workflow processing: {self.workflow_type} for {self.image_path}")
+        logger.info("Starting active workflow processing: %s for %s",
+                    self.workflow_type, self.image_path)
 
         # Get active workflow for this type
         active_workflow = self._get_active_workflow()
@@ -740,7 +1200,8 @@ class ActiveWorkflowOperator(BaseOperator):
         endpoint = self._get_processing_endpoint()
         result = self._make_request(endpoint, payload)
 
-        logger.info(f"Active workflow processing completed: {result.get('outputPath')}")
+        logger.info("Active workflow processing completed: %s",
+                    result.get('outputPath'))
 
         return {
             'outputPath': result.get('outputPath'),
@@ -752,55 +1213,43 @@ class ActiveWorkflowOperator(BaseOperator):
     def _get_active_workflow(self) -> Optional[Dict[str, Any]]:
         """Get the active workflow for the specified type."""
         try:
-            url = f"{self.base_url}/api/v1/workflows/active"
-            params = {'processingType': self.processing_type}
-
-            response = requests.get(url, params=params, timeout=30)
-            response.raise_for_status()
-
-            active_workflows = response.json()
-
             # Find matching workflow
-            for workflow in active_workflows:
-                if workflow.get('workflowName') == self.workflow_type:
-                    logger.info(f"Selected active workflow: {workflow.get('workflowName')} "
-                              f"version {workflow.get('workflowVersion')} "
-                              f"(deterministic - always 100%)")
-                    return workflow
-
-            logger.warning(f"No active workflow found for {self.workflow_type}")
+            workflows = _active_workflows(self.base_url, self.processing_type)
+            workflow = workflows.get(self.workflow_type)
+            if workflow:
+                logger.info("Selected active workflow: %s version %s "
+                            "(deterministic - always 100%%)",
+                            workflow.get('workflowName'),
+                            workflow.get('workflowVersion'))
+                return workflow
+
+            logger.warning("No active workflow found for %s", self.workflow_type)
             return None
 
         except requests.exceptions.RequestException as e:
-            logger.error(f"Failed to get active workflows: {e}")
+            logger.error("Failed to get active workflows: %s", e)
             return None
 
     def _get_processing_endpoint(self) -> str:
         """Map workflow type to processing endpoint."""
-        endpoint_mapping = {
-            'bias-subtraction': 'bias-subtract',
-            'dark-subtraction': 'dark-subtract',
-            'flat-field-correction': 'flat-correct',
-            'cosmic-ray-removal': 'cosmic-ray-remove'
-        }
-        return endpoint_mapping.get(self.workflow_type, 'process')
+        return _WORKFLOW_TO_STEP.get(self.workflow_type, 'process')
 
     def _make_request(self, endpoint: str, payload: Dict[str, Any]) -> Dict[str, Any]:
         """Make HTTP request to processing endpoint."""
-        url = f"{self.base_url}/api/v1/processing/steps/{endpoint}"
+        url = self._step_url_prefix + endpoint
 
         try:
-            response = requests.post(
+            response = _http_session().post(
                 url,
-                json=payload,
+                data=json_dumps(payload),
                 headers={'Content-Type': 'application/json'},
                 timeout=self.timeout
             )
             response.raise_for_status()
-            return response.json()
+            return json_loads(response.content)
 
         except requests.exceptions.RequestException as e:
-            logger.error(f"Processing request failed: {e}")
+            logger.error("Processing request failed: %s", e)
             raise AirflowException(f"Failed to execute {endpoint}: {e}")
 
 
@@ -835,14 +1284,12 @@ class WorkflowComparisonOperator(BaseOperator):
         self.processing_type = processing_type
 
         # Get base URL from Airflow Variables
-        self.base_url = Variable.get(
-            "image_processor_base_url",
-            "http://image-processor-service:8080"
-        )
+        self.base_url = _image_processor_base_url()
 
     def execute(self, context: Dict) -> Dict[str, Any]:
         """Execute workflow comparison."""
-        logger.info(f"Starting workflow comparison: {self.baseline_version} vs {self.comparison_version}")
+        logger.info("Starting workflow comparison: %s vs %s",
+                    self.baseline_version, self.comparison_version)
 
         # Get comparison results from API
         url = f"{self.base_url}/api/v1/workflows/{self.workflow_name}/compare"
@@ -853,10 +1300,10 @@ class WorkflowComparisonOperator(BaseOperator):
         }
 
         try:
-            response = requests.get(url, params=params, timeout=60)
+            response = _http_session().get(url, params=params, timeout=60)
             response.raise_for_status()
 
-            comparison_result = response.json()
+            comparison_result = json_loads(response.content)
 
             # Store detailed comparison in XCom
             context['ti'].xcom_push(
@@ -865,13 +1312,15 @@ class WorkflowComparisonOperator(BaseOperator):
             )
 
             # Log key findings
-            recommendation = comparison_result.get('recommendation', 'No recommendation available')
-            logger.info(f"Workflow comparison completed. Recommendation: {recommendation}")
+            recommendation = comparison_result.get('recommendation',
+                                                   'No recommendation available')
+            logger.info("Workflow comparison completed. Recommendation: %s",
+                        recommendation)
 
             return comparison_result
 
         except requests.exceptions.RequestException as e:
-            logger.error(f"Workflow comparison failed: {e}")
+            logger.error("Workflow comparison failed: %s", e)
             raise AirflowException(f"Failed to compare workflows: {e}")
 
 
@@ -906,14 +1355,12 @@ class WorkflowPromotionOperator(BaseOperator):
         self.set_as_default = set_as_default
 
         # Get base URL from Airflow Variables
-        self.base_url = Variable.get(
-            "image_processor_base_url",
-            "http://image-processor-service:8080"
-        )
+        self.base_url = _image_processor_base_url()
 
     def execute(self, context: Dict) -> Dict[str, Any]:
         """Execute workflow promotion."""
-        logger.info(f"Promoting experimental workflow {self.experiment_name} to production {self.new_production_version}")
+        logger.info("Promoting experimental workflow %s to production %s",
+                    self.experiment_name, self.new_production_version)
 
         url = f"{self.base_url}/api/v1/workflows/experimental/{self.experiment_name}/promote"
 
@@ -926,15 +1373,15 @@ class WorkflowPromotionOperator(BaseOperator):
         }
 
         try:
-            response = requests.post(
+            response = _http_session().post(
                 url,
-                json=payload,
+                data=json_dumps(payload),
                 headers={'Content-Type': 'application/json'},
                 timeout=60
             )
             response.raise_for_status()
 
-            promotion_result = response.json()
+            promotion_result = json_loads(response.content)
 
             # Store promotion details in XCom
             context['ti'].xcom_push(
@@ -948,10 +1395,11 @@ class WorkflowPromotionOperator(BaseOperator):
                 }
             )
 
-            logger.info(f"Workflow promotion completed successfully: {promotion_result.get('workflowVersion')}")
+            logger.info("Workflow promotion completed successfully: %s",
+                        promotion_result.get('workflowVersion'))
 
             return promotion_result
 
         except requests.exceptions.RequestException as e:
-            logger.error(f"Workflow promotion failed: {e}")
+            logger.error("Workflow promotion failed: %s", e)
             raise AirflowException(f"Failed to promote workflow: {e}")
\ No newline at end of file
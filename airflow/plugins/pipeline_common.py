@@ -0,0 +1,61 @@
+"""
+Shared Helpers for the Astronomical Processing DAGs
+
+JSON serialization and the process-wide S3 client used by the processing
+DAGs and the granular processing operators.
+
+Author: STScI Demo Project
+"""
+
+from typing import Any
+import json
+import os
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the standard library
+    orjson = None
+
+
+def json_dumps(payload: Any, indent: bool = False) -> bytes:
+    """
+    Serialize a payload to JSON bytes, using orjson when available.
+
+    The result is meant for request and S3 bodies; trigger kwargs go through
+    Airflow's serializer, which stores bytes as their repr, so pass triggers
+    the plain object instead.
+    """
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_INDENT_2 if indent else 0)
+    if indent:
+        return json.dumps(payload, indent=2).encode('utf-8')
+    return json.dumps(payload, separators=(',', ':')).encode('utf-8')
+
+
+def json_loads(data: bytes) -> Any:
+    """Parse JSON bytes, using orjson when available."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+# S3 client cached per worker process; created lazily so DAG parsing never
+# imports boto3 and forked workers never inherit a parent's connection pool
+_S3_CLIENT = None
+_S3_CLIENT_PID = None
+
+
+def get_s3_client():
+    """Return the process-wide S3 client (boto3 clients are thread-safe)."""
+    global _S3_CLIENT, _S3_CLIENT_PID
+    if _S3_CLIENT is None or _S3_CLIENT_PID != os.getpid():
+        import boto3
+        from botocore.config import Config
+
+        _S3_CLIENT = boto3.client('s3', config=Config(
+            max_pool_connections=64,
+            retries={'max_attempts': 10, 'mode': 'adaptive'},
+            tcp_keepalive=True
+        ))
+        _S3_CLIENT_PID = os.getpid()
+    return _S3_CLIENT
@@ -0,0 +1,126 @@
+"""
+Triggers for Image Processor Job Monitoring
+
+Async triggers that poll the image processor service on the Airflow
+triggerer, so tasks waiting on processing jobs do not hold a worker slot.
+
+Author: STScI Demo Project
+"""
+
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import asyncio
+import time
+
+from airflow.triggers.base import BaseTrigger, TriggerEvent
+
+TERMINAL_JOB_STATUSES = frozenset({'COMPLETED', 'FAILED'})
+
+
+class ProcessingJobStatusTrigger(BaseTrigger):
+    """
+    Poll image processor jobs until every job is terminal or the deadline passes.
+
+    Each round fans out one status GET per still-pending job over a shared
+    aiohttp session, then sleeps for poll_interval. The deadline is an
+    absolute epoch time so it survives the trigger being restarted.
+
+    Rounds in which no job changes status stretch the interval by half,
+    up to max_poll_interval; any progress resets it to poll_interval.
+
+    The emitted event carries the latest status payload seen for each job,
+    keyed by job id; jobs that never reported a status are absent. Its
+    status is 'degraded' when more than max_failed_fraction of the jobs
+    have FAILED, which is reported as soon as it happens rather than
+    waiting for the remaining jobs.
+    """
+
+    def __init__(self, base_url: str, job_ids: List[str], deadline: float,
+                 poll_interval: float = 30.0, max_poll_interval: float = 120.0,
+                 max_failed_fraction: Optional[float] = None):
+        super().__init__()
+        self.base_url = base_url
+        self.job_ids = job_ids
+        self.deadline = deadline
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.max_failed_fraction = max_failed_fraction
+
+    def serialize(self) -> Tuple[str, Dict[str, Any]]:
+        return (
+            "processing_job_triggers.ProcessingJobStatusTrigger",
+            {
+                'base_url': self.base_url,
+                'job_ids': self.job_ids,
+                'deadline': self.deadline,
+                'poll_interval': self.poll_interval,
+                'max_poll_interval': self.max_poll_interval,
+                'max_failed_fraction': self.max_failed_fraction,
+            },
+        )
+
+    async def _fetch_status(self, session, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return the job's status payload, or None if it could not be read."""
+        try:
+            url = f"{self.base_url}/api/v1/processing/jobs/{job_id}"
+            async with session.get(url) as response:
+                if response.status == 200:
+                    return await response.json(content_type=None)
+                self.log.warning("Failed to get status for job %s: %s",
+                                 job_id, response.status)
+        except Exception as e:
+            self.log.error("Error checking job %s: %s", job_id, e)
+        return None
+
+    async def run(self) -> AsyncIterator[TriggerEvent]:
+        import aiohttp
+
+        statuses: Dict[str, Dict[str, Any]] = {}
+        interval = self.poll_interval
+        connector = aiohttp.TCPConnector(limit=32, ttl_dns_cache=300)
+        timeout = aiohttp.ClientTimeout(total=10)
+
+        def status_of(job_id: str) -> Optional[str]:
+            return statuses.get(job_id, {}).get('status')
+
+        async with aiohttp.ClientSession(connector=connector,
+                                         timeout=timeout) as session:
+            while True:
+                pending = [
+                    job_id for job_id in self.job_ids
+                    if status_of(job_id) not in TERMINAL_JOB_STATUSES
+                ]
+                results = await asyncio.gather(*(
+                    self._fetch_status(session, job_id) for job_id in pending
+                ))
+                progressed = False
+                for job_id, job_status in zip(pending, results):
+                    if job_status is not None:
+                        progressed |= job_status.get('status') != status_of(job_id)
+                        statuses[job_id] = job_status
+
+                failed = sum(
+                    1 for job_status in statuses.values()
+                    if job_status.get('status') == 'FAILED'
+                )
+                if (self.max_failed_fraction is not None
+                        and failed > self.max_failed_fraction * len(self.job_ids)):
+                    self.log.error("%d of %d jobs FAILED; not waiting for the rest",
+                                   failed, len(self.job_ids))
+                    yield TriggerEvent({'status': 'degraded', 'jobs': statuses})
+                    return
+
+                remaining = sum(
+                    1 for job_id in pending
+                    if status_of(job_id) not in TERMINAL_JOB_STATUSES
+                )
+                if remaining == 0 or time.time() + interval >= self.deadline:
+                    yield TriggerEvent({'status': 'success', 'jobs': statuses})
+                    return
+
+                if progressed:
+                    interval = self.poll_interval
+                else:
+                    interval = min(interval * 1.5, self.max_poll_interval)
+                self.log.info("%d of %d jobs still running; next check in %.0fs",
+                              remaining, len(self.job_ids), interval)
+                await asyncio.sleep(interval)
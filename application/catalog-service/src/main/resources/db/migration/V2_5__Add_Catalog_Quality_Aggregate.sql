@@ -0,0 +1,21 @@
+-- Add hourly catalog quality aggregate for the data quality monitoring DAG
+-- The DAG reads these pre-aggregated counters instead of scanning astronomical_objects every run
+
+-- =====================================================
+-- Hourly quality counters
+-- =====================================================
+
+CREATE MATERIALIZED VIEW catalog_quality_agg AS
+SELECT
+    date_trunc('hour', created_at) AS bucket,
+    COUNT(*) AS n,
+    COUNT(*) FILTER (WHERE magnitude IS NULL) AS n_no_mag,
+    COUNT(*) FILTER (WHERE ra < 0 OR ra >= 360 OR decl < -90 OR decl > 90) AS n_bad_coords,
+    COUNT(*) FILTER (WHERE ra IS NOT NULL AND decl IS NOT NULL) AS n_with_coords
+FROM astronomical_objects
+GROUP BY 1;
+
+-- Unique index is required for REFRESH MATERIALIZED VIEW CONCURRENTLY
+CREATE UNIQUE INDEX idx_catalog_quality_agg_bucket ON catalog_quality_agg (bucket);
+
+COMMENT ON MATERIALIZED VIEW catalog_quality_agg IS 'Hourly astronomical_objects quality counters, refreshed by the data_quality_monitoring DAG';
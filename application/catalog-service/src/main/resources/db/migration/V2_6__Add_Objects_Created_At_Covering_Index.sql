@@ -0,0 +1,8 @@
+-- Add covering index for the telescope processing quality check
+-- The hourly quality check aggregates astronomical_objects created in the last hour; without an
+-- index on created_at every run scans the whole table. Including object_type and magnitude lets
+-- the aggregate run as an index-only range scan over just the recent rows.
+
+CREATE INDEX idx_objects_created_at
+ON astronomical_objects (created_at)
+INCLUDE (object_type, magnitude);
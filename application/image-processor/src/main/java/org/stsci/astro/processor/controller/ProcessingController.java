@@ -19,6 +19,7 @@ import org.stsci.astro.processor.entity.ProcessingJob;
 import org.stsci.astro.processor.service.ProcessingJobService;
 
 import jakarta.validation.Valid;
+import java.util.List;
 import java.util.Map;
 import java.util.Optional;
 
@@ -58,6 +59,14 @@ public class ProcessingController {
                  .orElse(ResponseEntity.notFound().build());
     }
 
+    @PostMapping("/jobs/status/batch")
+    @Operation(summary = "Get statuses for multiple jobs")
+    @ApiResponse(responseCode = "200", description = "Job statuses retrieved")
+    public ResponseEntity<Map<String, ProcessingJob.ProcessingStatus>> getJobStatuses(
+            @RequestBody List<String> jobIds) {
+        return ResponseEntity.ok(processingJobService.getJobStatuses(jobIds));
+    }
+
     @GetMapping("/jobs")
     @Operation(summary = "List jobs with pagination and filtering")
     @ApiResponse(responseCode = "200", description = "Jobs retrieved successfully")
@@ -9,6 +9,7 @@ import org.springframework.stereotype.Repository;
 import org.stsci.astro.processor.entity.ProcessingJob;
 
 import java.time.LocalDateTime;
+import java.util.Collection;
 import java.util.List;
 import java.util.Optional;
 
@@ -23,6 +24,11 @@ public interface ProcessingJobRepository extends JpaRepository<ProcessingJob, Lo
      */
     Optional<ProcessingJob> findByJobId(String jobId);
 
+    /**
+     * Find jobs by a set of job IDs
+     */
+    List<ProcessingJob> findByJobIdIn(Collection<String> jobIds);
+
     /**
      * Find jobs by status
      */
@@ -18,6 +18,7 @@ import org.stsci.astro.processor.repository.ProcessingJobRepository;
 import org.stsci.astro.processor.util.MetricsCollector;
 
 import java.time.LocalDateTime;
+import java.util.Collection;
 import java.util.List;
 import java.util.Map;
 import java.util.Optional;
@@ -82,6 +83,15 @@ public class ProcessingJobService {
                 .map(JobStatusResponse::fromEntity);
     }
 
+    /**
+     * Get statuses for multiple jobs in a single lookup; unknown IDs are omitted
+     */
+    @Transactional(readOnly = true)
+    public Map<String, ProcessingJob.ProcessingStatus> getJobStatuses(Collection<String> jobIds) {
+        return jobRepository.findByJobIdIn(jobIds).stream()
+                .collect(Collectors.toMap(ProcessingJob::getJobId, ProcessingJob::getStatus));
+    }
+
     /**
      * List jobs with pagination and filtering
      */
@@ -0,0 +1,5 @@
+-- Add partial indexes for terminal-status job counts
+-- Used by the data quality monitoring DAG, which counts COMPLETED and FAILED jobs over a recent window
+
+CREATE INDEX idx_processing_jobs_completed_created_at ON processing_jobs(created_at) WHERE status = 'COMPLETED';
+CREATE INDEX idx_processing_jobs_failed_created_at ON processing_jobs(created_at) WHERE status = 'FAILED';
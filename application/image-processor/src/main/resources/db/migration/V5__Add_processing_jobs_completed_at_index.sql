@@ -0,0 +1,4 @@
+-- Add partial index for recently completed jobs
+-- Supports completed_at range scans in the data quality monitoring DAG consistency check
+
+CREATE INDEX idx_processing_jobs_completed_at ON processing_jobs(completed_at) WHERE status = 'COMPLETED';
@@ -0,0 +1,21 @@
+-- Create fits_validation_cache table for the telescope data processing DAG
+-- Overlapping hourly runs see the same raw files; header validation outcomes are cached per
+-- object version (bucket, key, last_modified) so each file's header is only read once.
+-- UNLOGGED: the cache is disposable, so skip WAL; a crash simply empties it.
+
+CREATE UNLOGGED TABLE fits_validation_cache (
+    bucket          VARCHAR(255) NOT NULL,
+    object_key      VARCHAR(1024) NOT NULL,
+    last_modified   TIMESTAMPTZ NOT NULL,
+    reason          TEXT,
+    checked_at      TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+
+    PRIMARY KEY (bucket, object_key, last_modified)
+);
+
+-- Index for expiring old entries
+CREATE INDEX idx_fits_validation_cache_checked_at ON fits_validation_cache(checked_at);
+
+-- Comments for documentation
+COMMENT ON TABLE fits_validation_cache IS 'Cached FITS header validation outcomes, written by the telescope_data_processing DAG';
+COMMENT ON COLUMN fits_validation_cache.reason IS 'Rejection reason, NULL when the header is valid';
@@ -140,6 +140,27 @@ class ProcessingControllerTest {
 
     // ========== Job Listing Tests ==========
 
+    @Test
+    void getJobStatuses_ShouldReturnStatusPerJob() throws Exception {
+        // Given
+        List<String> jobIds = Arrays.asList("job_123", "job_456");
+        Map<String, ProcessingJob.ProcessingStatus> statuses = new HashMap<>();
+        statuses.put("job_123", ProcessingJob.ProcessingStatus.COMPLETED);
+        statuses.put("job_456", ProcessingJob.ProcessingStatus.RUNNING);
+
+        when(processingJobService.getJobStatuses(jobIds)).thenReturn(statuses);
+
+        // When & Then
+        mockMvc.perform(post("/api/v1/processing/jobs/status/batch")
+                .contentType(MediaType.APPLICATION_JSON)
+                .content(objectMapper.writeValueAsString(jobIds)))
+                .andExpect(status().isOk())
+                .andExpect(jsonPath("$.job_123").value("COMPLETED"))
+                .andExpect(jsonPath("$.job_456").value("RUNNING"));
+
+        verify(processingJobService, times(1)).getJobStatuses(jobIds);
+    }
+
     @Test
     void listJobs_WithoutFilters_ShouldReturnAllJobs() throws Exception {
         // Given
@@ -137,6 +137,20 @@ class ProcessingJobServiceTest {
         assertFalse(response.isPresent());
     }
 
+    @Test
+    void getJobStatuses_ShouldOmitUnknownJobs() {
+        // Given
+        List<String> jobIds = Arrays.asList("job_123456789", "non-existing-job");
+        when(jobRepository.findByJobIdIn(jobIds)).thenReturn(List.of(sampleJob));
+
+        // When
+        Map<String, ProcessingJob.ProcessingStatus> statuses = processingJobService.getJobStatuses(jobIds);
+
+        // Then
+        assertEquals(1, statuses.size());
+        assertEquals(ProcessingJob.ProcessingStatus.QUEUED, statuses.get("job_123456789"));
+    }
+
     @Test
     void listJobs_ShouldReturnPagedResults() {
         // Given
@@ -54,4 +54,15 @@ output "s3_kms_key_arn" {
 output "s3_kms_key_id" {
   description = "ID of the S3 KMS key"
   value       = var.enable_kms_encryption ? aws_kms_key.s3[0].key_id : null
-}
\ No newline at end of file
+}
+
+# FITS arrival queue outputs for the telescope processing DAG
+output "fits_arrival_queue_url" {
+  description = "URL of the SQS queue receiving raw FITS arrival events"
+  value       = try(aws_sqs_queue.fits_arrivals[0].id, null)
+}
+
+output "fits_arrival_queue_arn" {
+  description = "ARN of the SQS queue receiving raw FITS arrival events"
+  value       = try(aws_sqs_queue.fits_arrivals[0].arn, null)
+}
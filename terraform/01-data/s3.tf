@@ -85,6 +85,9 @@ resource "aws_s3_bucket_lifecycle_configuration" "data_buckets" {
 resource "aws_s3_bucket_notification" "data_processing_trigger" {
   bucket = aws_s3_bucket.data_buckets["raw-data"].id
 
+  # Also publish events to EventBridge for the FITS arrival queue (sqs.tf)
+  eventbridge = var.enable_fits_arrival_queue
+
   lambda_function {
     lambda_function_arn = aws_lambda_function.s3_trigger.arn
     events              = ["s3:ObjectCreated:*"]
@@ -95,6 +98,54 @@ resource "aws_s3_bucket_notification" "data_processing_trigger" {
   depends_on = [aws_lambda_permission.s3_invoke]
 }
 
+# Daily inventory of raw FITS objects so batch reprocessing avoids live LIST scans
+resource "aws_s3_bucket_inventory" "raw_data_daily" {
+  count = var.enable_raw_data_inventory ? 1 : 0
+
+  bucket                   = aws_s3_bucket.data_buckets["raw-data"].id
+  name                     = "raw-data-daily"
+  included_object_versions = "Current"
+  optional_fields          = ["Size", "LastModifiedDate"]
+
+  schedule {
+    frequency = "Daily"
+  }
+
+  destination {
+    bucket {
+      format     = "CSV"
+      bucket_arn = aws_s3_bucket.data_buckets["processed-data"].arn
+      prefix     = "inventory"
+    }
+  }
+}
+
+# Allow S3 to deliver inventory reports into the processed data bucket
+resource "aws_s3_bucket_policy" "inventory_destination" {
+  count = var.enable_raw_data_inventory ? 1 : 0
+
+  bucket = aws_s3_bucket.data_buckets["processed-data"].id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [{
+      Sid       = "AllowRawDataInventoryDelivery"
+      Effect    = "Allow"
+      Principal = { Service = "s3.amazonaws.com" }
+      Action    = "s3:PutObject"
+      Resource  = "${aws_s3_bucket.data_buckets["processed-data"].arn}/inventory/*"
+      Condition = {
+        ArnLike = {
+          "aws:SourceArn" = aws_s3_bucket.data_buckets["raw-data"].arn
+        }
+        StringEquals = {
+          "s3:x-amz-acl" = "bucket-owner-full-control"
+        }
+      }
+    }]
+  })
+}
+
 # Generate unique suffix to prevent bucket naming conflicts
 resource "random_id" "bucket_suffix" {
   byte_length = 8
@@ -0,0 +1,84 @@
+# Queue of raw FITS arrivals, fed by S3 EventBridge notifications, so the
+# telescope processing DAG drains new keys instead of listing the raw bucket
+resource "aws_sqs_queue" "fits_arrivals" {
+  count = var.enable_fits_arrival_queue ? 1 : 0
+
+  name                       = "${var.project_name}-${var.environment}-fits-arrivals"
+  visibility_timeout_seconds = 900     # Covers one DAG discovery task; undeleted messages reappear afterwards
+  message_retention_seconds  = 1209600 # 14 days, so arrivals survive a paused DAG
+  receive_wait_time_seconds  = 20
+  sqs_managed_sse_enabled    = true
+
+  redrive_policy = jsonencode({
+    deadLetterTargetArn = aws_sqs_queue.fits_arrivals_dlq[0].arn
+    maxReceiveCount     = 5
+  })
+
+  tags = merge(var.additional_tags, {
+    Name = "${var.project_name}-${var.environment}-fits-arrivals"
+  })
+}
+
+# Dead letter queue for arrival messages the DAG repeatedly fails to process
+resource "aws_sqs_queue" "fits_arrivals_dlq" {
+  count = var.enable_fits_arrival_queue ? 1 : 0
+
+  name                      = "${var.project_name}-${var.environment}-fits-arrivals-dlq"
+  message_retention_seconds = 1209600
+  sqs_managed_sse_enabled   = true
+
+  tags = merge(var.additional_tags, {
+    Name = "${var.project_name}-${var.environment}-fits-arrivals-dlq"
+  })
+}
+
+# Route raw bucket Object Created events for FITS files to the arrival queue
+resource "aws_cloudwatch_event_rule" "fits_arrivals" {
+  count = var.enable_fits_arrival_queue ? 1 : 0
+
+  name        = "${var.project_name}-${var.environment}-fits-arrivals"
+  description = "FITS objects created in the raw data bucket"
+
+  event_pattern = jsonencode({
+    source      = ["aws.s3"]
+    detail-type = ["Object Created"]
+    detail = {
+      bucket = { name = [aws_s3_bucket.data_buckets["raw-data"].id] }
+      object = { key = [{ suffix = ".fits" }] }
+    }
+  })
+
+  tags = merge(var.additional_tags, {
+    Name = "${var.project_name}-${var.environment}-fits-arrivals"
+  })
+}
+
+resource "aws_cloudwatch_event_target" "fits_arrivals" {
+  count = var.enable_fits_arrival_queue ? 1 : 0
+
+  rule = aws_cloudwatch_event_rule.fits_arrivals[0].name
+  arn  = aws_sqs_queue.fits_arrivals[0].arn
+}
+
+# Allow EventBridge to deliver the rule's events into the arrival queue
+resource "aws_sqs_queue_policy" "fits_arrivals" {
+  count = var.enable_fits_arrival_queue ? 1 : 0
+
+  queue_url = aws_sqs_queue.fits_arrivals[0].id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [{
+      Sid       = "AllowFitsArrivalEvents"
+      Effect    = "Allow"
+      Principal = { Service = "events.amazonaws.com" }
+      Action    = "sqs:SendMessage"
+      Resource  = aws_sqs_queue.fits_arrivals[0].arn
+      Condition = {
+        ArnEquals = {
+          "aws:SourceArn" = aws_cloudwatch_event_rule.fits_arrivals[0].arn
+        }
+      }
+    }]
+  })
+}
@@ -87,6 +87,18 @@ variable "enable_kms_encryption" {
   default     = false
 }
 
+variable "enable_raw_data_inventory" {
+  description = "Publish a daily S3 Inventory of the raw data bucket for batch reprocessing discovery"
+  type        = bool
+  default     = true
+}
+
+variable "enable_fits_arrival_queue" {
+  description = "Queue raw FITS arrivals in SQS via EventBridge for event-driven discovery in the telescope processing DAG"
+  type        = bool
+  default     = true
+}
+
 variable "airflow_namespace" {
   description = "Kubernetes namespace for Airflow"
   type        = string
@@ -178,6 +178,15 @@ resource "aws_iam_policy" "eks_s3_access" {
           "arn:aws:s3:::${var.project_name}-${var.environment}-*",
           "arn:aws:s3:::${var.project_name}-${var.environment}-*/*"
         ]
+      },
+      {
+        Effect = "Allow"
+        Action = [
+          "sqs:ReceiveMessage",
+          "sqs:DeleteMessage",
+          "sqs:GetQueueAttributes"
+        ]
+        Resource = "arn:aws:sqs:*:*:${var.project_name}-${var.environment}-fits-arrivals"
       }
     ]
   })